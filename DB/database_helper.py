@@ -11,6 +11,7 @@ from datetime import datetime
 from typing import Any, Optional
 
 _MIGRATED: set[str] = set()  # process-level cache of migrated db paths
+_BOOTSTRAPPED: set[str] = set()  # db paths already WAL-switched + version-checked
 
 
 class SerpAPIDatabase:
@@ -25,8 +26,18 @@ class SerpAPIDatabase:
     # ------------------------------------------------------------------
     def get_connection(self) -> sqlite3.Connection:
         conn = sqlite3.connect(self.db_path)
+        # journal_mode=WAL persists in the file and the version rows only need
+        # creating once, so that bootstrap runs once per database file per
+        # process; later connections (one per raw insert) only set foreign_keys
+        # and confirm schema_version still exists (a file replaced at the same
+        # path, e.g. restored or recreated, gets bootstrapped again).
+        key = os.path.abspath(self.db_path) if self.db_path != ':memory:' else None
+        bootstrapped = key is not None and key in _BOOTSTRAPPED and self._has_schema_version(conn)
+        if key is not None and not bootstrapped:
+            _BOOTSTRAPPED.discard(key)
+            _MIGRATED.discard(key)
         try:
-            if self.enable_wal:
+            if self.enable_wal and not bootstrapped:
                 try:
                     conn.execute("PRAGMA journal_mode=WAL")
                 except Exception:
@@ -34,10 +45,22 @@ class SerpAPIDatabase:
             conn.execute("PRAGMA foreign_keys=ON")
         except Exception:
             pass
-        self._ensure_migration(conn)
-        self._ensure_schema_version(conn)
+        if not bootstrapped:
+            self._ensure_migration(conn)
+            self._ensure_schema_version(conn)
+            if key is not None and self.enable_wal:
+                _BOOTSTRAPPED.add(key)
         return conn
 
+    @staticmethod
+    def _has_schema_version(conn: sqlite3.Connection) -> bool:
+        try:
+            return conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='schema_version'"
+            ).fetchone() is not None
+        except sqlite3.Error:
+            return False
+
     # ------------------------------------------------------------------
     # Migration (legacy cleanup)
     # ------------------------------------------------------------------
@@ -369,22 +392,26 @@ class SerpAPIDatabase:
         cursor = conn.cursor()
         try:
             stats: dict[str, Any] = {}
-            cursor.execute("SELECT COUNT(*) FROM api_queries")
-            stats["total_records"] = cursor.fetchone()[0]
+            # The total is the sum of the per-type counts: one scan of
+            # idx_query_type instead of a second COUNT(*) pass. MIN/MAX below
+            # stay separate since idx_created_at answers them with two seeks.
             cursor.execute("SELECT query_type, COUNT(*) FROM api_queries GROUP BY query_type")
-            stats["records_by_type"] = dict(cursor.fetchall())
-            cursor.execute("SELECT MIN(created_at), MAX(created_at) FROM api_queries")
-            dr = cursor.fetchone()
+            by_type = dict(cursor.fetchall())
+            stats["total_records"] = sum(by_type.values())
+            stats["records_by_type"] = by_type
+            if by_type:
+                cursor.execute("SELECT MIN(created_at), MAX(created_at) FROM api_queries")
+                dr = cursor.fetchone()
+            else:  # empty table: MIN/MAX would only return NULLs
+                dr = (None, None)
             stats["date_range"] = {"earliest": dr[0], "latest": dr[1]}
             try:
-                cursor.execute("SELECT * FROM database_metadata WHERE id = 1")
+                cursor.execute(
+                    "SELECT database_version, created_date, last_modified FROM database_metadata WHERE id = 1"
+                )
                 metadata = cursor.fetchone()
                 if metadata:
-                    stats["metadata"] = {
-                        "database_version": metadata[1],
-                        "created_date": metadata[2],
-                        "last_modified": metadata[3],
-                    }
+                    stats["metadata"] = dict(zip(("database_version", "created_date", "last_modified"), metadata, strict=True))
             except Exception:  # pragma: no cover
                 pass
             return stats
@@ -9,7 +9,8 @@ import sqlite3
 from datetime import datetime, timedelta
 from typing import Any, Optional
 
-from core.db_utils import open_connection
+from core.db_utils import in_clause, open_connection
+from core.json_utils import loads as _json_loads  # type: ignore
 from core.metrics import METRICS  # type: ignore
 
 
@@ -41,6 +42,8 @@ class FlightSearchCache:
         # NOTE: Key stability contract: only normalized, non-null, lower-cased strings + raw values.
         # If new functional search parameters are added upstream they MUST be included here
         # (or intentionally omitted) to avoid silent cache collisions or under-segmentation.
+        # The digest is persisted in flight_searches.cache_key, so it stays SHA-256.
+        # Not memoized: hash-equal params (1 / 1.0 / True) serialize differently.
         normalized: dict[str, Any] = {}
         for k, v in search_params.items():
             if v is not None:
@@ -72,97 +75,143 @@ class FlightSearchCache:
                     self.logger.info(f"[cache:{cache_key[:12]}] Cache MISS")
                     METRICS.inc('cache_misses')
                     return None
-                hit_search_id = row['search_id'] if 'search_id' in row.keys() else 'unknown'
-                self.logger.info(f"[{hit_search_id}] Cache HIT key={cache_key[:12]}")
-                METRICS.inc('cache_hits')
-                # Fetch flight results
+                return self._hydrate(cur, row, cache_key)
+        except Exception as e:
+            self.logger.error(f"Error searching cache: {e}")
+            return None
+
+    def search_cache_many(self, cache_keys: list[str], max_age_hours: int = 24) -> dict[str, dict[str, Any]]:
+        """Batch variant of search_cache keyed by precomputed cache keys.
+
+        Resolves the freshest search row for every key with a single
+        ``cache_key IN (...)`` query, then hydrates only the hits. Keys without
+        a fresh row are simply absent from the returned mapping.
+        """
+        keys = list(dict.fromkeys(k for k in cache_keys if k))
+        if not keys:
+            return {}
+        hits: dict[str, dict[str, Any]] = {}
+        try:
+            with open_connection(self.db_path) as conn:
+                conn.row_factory = sqlite3.Row
+                cur = conn.cursor()
+                cutoff = datetime.now() - timedelta(hours=max_age_hours)
+                placeholders, key_params = in_clause(keys)  # stable 8-slot shape for a week probe
                 cur.execute(
-                    """
-                    SELECT id, total_price, price_currency, total_duration, layover_count, result_type,
-                           carbon_emissions_flight, booking_token
-                    FROM flight_results WHERE search_id = ? ORDER BY total_price ASC
+                    f"""
+                    SELECT fs.*, COUNT(fr.id) flight_count
+                    FROM flight_searches fs
+                    LEFT JOIN flight_results fr ON fs.search_id = fr.search_id
+                    WHERE fs.cache_key IN ({placeholders}) AND fs.created_at > ?
+                    GROUP BY fs.search_id
+                    ORDER BY fs.created_at DESC
                     """,
-                    (row["search_id"],)
+                    (*key_params, cutoff.isoformat())
                 )
-                flights = cur.fetchall()
-                best, other = [], []
-                any_segments = False
-                for (fid, price, curr, duration, layovers, rt, carbon, booking_token) in flights:
-                    cur.execute(
-                        """
-                        SELECT departure_airport_code, arrival_airport_code, airline_code, flight_number,
-                               departure_time, arrival_time, duration_minutes
-                        FROM flight_segments WHERE flight_result_id = ? ORDER BY segment_order
-                        """, (fid,)
-                    )
-                    seg_rows = cur.fetchall()
-                    # Fetch layovers (precomputed, static)
-                    cur.execute(
-                        """
-                        SELECT airport_code, duration_minutes, is_overnight
-                        FROM layovers WHERE flight_result_id = ?
-                        ORDER BY layover_order
-                        """,
-                        (fid,)
-                    )
-                    lay_rows = cur.fetchall()
-                    flight_obj = {
-                        'price': f'{price} {curr}' if price and curr else None,
-                        'total_duration': duration,
-                        # Build layovers array from DB so UI can render without recomputing
-                        'layovers': [
-                            {
-                                'id': r[0],  # airport_code
-                                'duration': r[1],  # minutes
-                                'overnight': bool(r[2])
-                            } for r in lay_rows
-                        ],
-                        'carbon_emissions': {'this_flight': carbon} if carbon else {},
-                        'booking_token': booking_token,
-                        'flights': []
-                    }
-                    for seg in seg_rows:
-                        dep, arr, airline, fnum, dep_t, arr_t, seg_dur = seg
-                        flight_obj['flights'].append({
-                            'departure_airport': {'id': dep},
-                            'arrival_airport': {'id': arr},
-                            'airline': airline,
-                            'flight_number': fnum,
-                            'departure_time': dep_t,
-                            'arrival_time': arr_t,
-                            'duration': seg_dur
-                        })
-                    if flight_obj['flights']:
-                        any_segments = True
-                    norm_type = 'best' if rt in ('best', 'best_flight') else 'other'
-                    (best if norm_type == 'best' else other).append(flight_obj)
-                # If structured cache has no segment details at all, fall back to raw API payload for UI completeness
-                if not any_segments:
-                    try:
-                        api_query_id = row['api_query_id'] if 'api_query_id' in row.keys() else None
-                        if api_query_id:
-                            cur.execute("SELECT raw_response FROM api_queries WHERE id = ?", (api_query_id,))
-                            raw_row = cur.fetchone()
-                            if raw_row and raw_row[0]:
-                                raw = json.loads(raw_row[0])
-                                best = raw.get('best_flights', []) or []
-                                other = raw.get('other_flights', []) or []
-                                self.logger.info(f"[{hit_search_id}] Using raw API fallback for UI (no segments in structured cache)")
-                    except Exception as _e:
-                        self.logger.warning(f"Raw fallback unavailable: {_e}")
-                return {
-                    'search_id': row['search_id'],
-                    'search_parameters': json.loads(row['raw_parameters']) if row['raw_parameters'] else {},
-                    'cached': True,
-                    'cache_timestamp': row['created_at'],
-                    'flight_results_count': row['flight_count'],
-                    'processing_status': 'cached_data',
-                    'best_flights': best,
-                    'other_flights': other
-                }
+                latest: dict[str, sqlite3.Row] = {}
+                for row in cur.fetchall():
+                    latest.setdefault(row['cache_key'], row)  # first row per key is the freshest
+                for key in keys:
+                    row = latest.get(key)
+                    if row is None:
+                        self.logger.info(f"[cache:{key[:12]}] Cache MISS")
+                        METRICS.inc('cache_misses')
+                        continue
+                    hits[key] = self._hydrate(cur, row, key)
         except Exception as e:
-            self.logger.error(f"Error searching cache: {e}")
-            return None
+            self.logger.error(f"Error searching cache (batch): {e}")
+        return hits
+
+    def _hydrate(self, cur: sqlite3.Cursor, row: sqlite3.Row, cache_key: str) -> dict[str, Any]:
+        """Rebuild the UI/API result shape for a cached flight_searches row."""
+        hit_search_id = row['search_id'] if 'search_id' in row.keys() else 'unknown'
+        self.logger.info(f"[{hit_search_id}] Cache HIT key={cache_key[:12]}")
+        METRICS.inc('cache_hits')
+        # Fetch flight results
+        cur.execute(
+            """
+            SELECT id, total_price, price_currency, total_duration, layover_count, result_type,
+                   carbon_emissions_flight, booking_token
+            FROM flight_results WHERE search_id = ? ORDER BY total_price ASC
+            """,
+            (row["search_id"],)
+        )
+        flights = cur.fetchall()
+        best, other = [], []
+        any_segments = False
+        for (fid, price, curr, duration, layovers, rt, carbon, booking_token) in flights:
+            cur.execute(
+                """
+                SELECT departure_airport_code, arrival_airport_code, airline_code, flight_number,
+                       departure_time, arrival_time, duration_minutes
+                FROM flight_segments WHERE flight_result_id = ? ORDER BY segment_order
+                """, (fid,)
+            )
+            seg_rows = cur.fetchall()
+            # Fetch layovers (precomputed, static)
+            cur.execute(
+                """
+                SELECT airport_code, duration_minutes, is_overnight
+                FROM layovers WHERE flight_result_id = ?
+                ORDER BY layover_order
+                """,
+                (fid,)
+            )
+            lay_rows = cur.fetchall()
+            flight_obj = {
+                'price': f'{price} {curr}' if price and curr else None,
+                'total_duration': duration,
+                # Build layovers array from DB so UI can render without recomputing
+                'layovers': [
+                    {
+                        'id': r[0],  # airport_code
+                        'duration': r[1],  # minutes
+                        'overnight': bool(r[2])
+                    } for r in lay_rows
+                ],
+                'carbon_emissions': {'this_flight': carbon} if carbon else {},
+                'booking_token': booking_token,
+                'flights': []
+            }
+            for seg in seg_rows:
+                dep, arr, airline, fnum, dep_t, arr_t, seg_dur = seg
+                flight_obj['flights'].append({
+                    'departure_airport': {'id': dep},
+                    'arrival_airport': {'id': arr},
+                    'airline': airline,
+                    'flight_number': fnum,
+                    'departure_time': dep_t,
+                    'arrival_time': arr_t,
+                    'duration': seg_dur
+                })
+            if flight_obj['flights']:
+                any_segments = True
+            norm_type = 'best' if rt in ('best', 'best_flight') else 'other'
+            (best if norm_type == 'best' else other).append(flight_obj)
+        # If structured cache has no segment details at all, fall back to raw API payload for UI completeness
+        if not any_segments:
+            try:
+                api_query_id = row['api_query_id'] if 'api_query_id' in row.keys() else None
+                if api_query_id:
+                    cur.execute("SELECT raw_response FROM api_queries WHERE id = ?", (api_query_id,))
+                    raw_row = cur.fetchone()
+                    if raw_row and raw_row[0]:
+                        raw = _json_loads(raw_row[0])
+                        best = raw.get('best_flights', []) or []
+                        other = raw.get('other_flights', []) or []
+                        self.logger.info(f"[{hit_search_id}] Using raw API fallback for UI (no segments in structured cache)")
+            except Exception as _e:
+                self.logger.warning(f"Raw fallback unavailable: {_e}")
+        return {
+            'search_id': row['search_id'],
+            'search_parameters': json.loads(row['raw_parameters']) if row['raw_parameters'] else {},
+            'cached': True,
+            'cache_timestamp': row['created_at'],
+            'flight_results_count': row['flight_count'],
+            'processing_status': 'cached_data',
+            'best_flights': best,
+            'other_flights': other
+        }
 
     # ------------------- cleanup -------------------
     def cleanup_old_data(self, max_age_hours: int = 24, prune_raw: bool = False):  # kept for compatibility
@@ -177,20 +226,30 @@ class FlightSearchCache:
             with open_connection(self.db_path) as conn:
                 cur = conn.cursor()
                 cutoff = datetime.now() - timedelta(hours=max_age_hours)
-                cur.execute("SELECT search_id FROM flight_searches WHERE created_at < ?", (cutoff.isoformat(),))
-                old_ids = [r[0] for r in cur.fetchall()]
-                for sid in old_ids:
-                    cur.execute("DELETE FROM layovers WHERE flight_result_id IN (SELECT id FROM flight_results WHERE search_id = ?)", (sid,))
-                    cur.execute("DELETE FROM flight_segments WHERE flight_result_id IN (SELECT id FROM flight_results WHERE search_id = ?)", (sid,))
-                    cur.execute("DELETE FROM flight_results WHERE search_id = ?", (sid,))
-                    cur.execute("DELETE FROM price_insights WHERE search_id = ?", (sid,))
-                    cur.execute("DELETE FROM flight_searches WHERE search_id = ?", (sid,))
+                # Expired ids are staged in a TEMP table (one scan of flight_searches)
+                # and removed with set-based DELETEs: nothing is fetched into Python
+                # and the statement count no longer grows with the number of ids.
+                cur.execute("CREATE TEMP TABLE IF NOT EXISTS expired_searches (search_id TEXT PRIMARY KEY)")
+                cur.execute("DELETE FROM temp.expired_searches")
+                cur.execute(
+                    "INSERT OR IGNORE INTO temp.expired_searches SELECT search_id FROM flight_searches WHERE created_at < ?",
+                    (cutoff.isoformat(),),
+                )
+                expired = cur.rowcount
+                if expired:
+                    in_expired = "IN (SELECT search_id FROM temp.expired_searches)"
+                    cur.execute(f"DELETE FROM layovers WHERE flight_result_id IN (SELECT id FROM flight_results WHERE search_id {in_expired})")
+                    cur.execute(f"DELETE FROM flight_segments WHERE flight_result_id IN (SELECT id FROM flight_results WHERE search_id {in_expired})")
+                    cur.execute(f"DELETE FROM flight_results WHERE search_id {in_expired}")
+                    cur.execute(f"DELETE FROM price_insights WHERE search_id {in_expired}")
+                    cur.execute(f"DELETE FROM flight_searches WHERE search_id {in_expired}")
+                cur.execute("DROP TABLE temp.expired_searches")
                 # Raw api_queries are only pruned when explicitly requested
                 if prune_raw:
                     cur.execute("DELETE FROM api_queries WHERE created_at < ?", (cutoff.isoformat(),))
                 conn.commit()
-                if old_ids:
-                    self.logger.info(f"Cleaned {len(old_ids)} expired searches (raw retained={not prune_raw})")
+                if expired:
+                    self.logger.info(f"Cleaned {expired} expired searches (raw retained={not prune_raw})")
         except Exception as e:
             self.logger.error(f"Cleanup error: {e}")
 
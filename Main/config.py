@@ -15,6 +15,9 @@ SERPAPI_CONFIG = {
     'timeout': 30,
     'max_retries': 3,
     'retry_delay': 1.0,
+    # Keep-alive pool for the shared requests.Session (week searches fan out up to 7 calls)
+    'pool_connections': 8,
+    'pool_maxsize': 32,
 }
 
 # Default search parameters
@@ -37,6 +40,17 @@ DATABASE_CONFIG = {
     'db_path': 'DB/Main_DB.db',  # Fixed: relative from project root
     'backup_on_error': True,
     'connection_timeout': 30,
+    # Per-connection tuning applied by core.db_utils.open_connection. The DB file
+    # is in WAL mode (set by SerpAPIDatabase), where synchronous=NORMAL is
+    # durable across application crashes and fsyncs only at checkpoints.
+    'connection_pragmas': {
+        'synchronous': 'NORMAL',
+        'temp_store': 'MEMORY',
+        'cache_size': -65536,  # KiB (64 MiB), allocated lazily
+    },
+    # Prepared statements kept per connection (sqlite3 default: 128). The writer's
+    # RETURNING / IN (...) batches add a few shapes per call on top of the fixed SQL.
+    'cached_statements': 256,
 }
 
 # Data processing configuration
@@ -46,6 +60,11 @@ PROCESSING_CONFIG = {
     'auto_extract_airports': True,
     'auto_extract_airlines': True,
     'calculate_analytics': True,
+    # Persist raw + structured data on a background writer thread so API responses
+    # return before the DB writes (response then carries API data, not the DB view)
+    'async_persistence': False,
+    # Writes queued on that thread before search_flights blocks (backpressure)
+    'async_persistence_max_pending': 64,
 }
 
 # Logging configuration
@@ -2,6 +2,8 @@
 from __future__ import annotations
 
 import re
+import threading
+import time
 from datetime import datetime, timedelta
 from typing import Any
 
@@ -13,20 +15,59 @@ class RateLimiter:
     def __init__(self):
         self._minute: list[datetime] = []
         self._hour: list[datetime] = []
+        # Week searches fan out across threads; guard the sliding windows
+        self._lock = threading.Lock()
     def can_make_request(self) -> bool:
         now = datetime.now()
-        self._minute = [t for t in self._minute if now - t < timedelta(minutes=1)]
-        self._hour = [t for t in self._hour if now - t < timedelta(hours=1)]
-        return (len(self._minute) < RATE_LIMIT_CONFIG['requests_per_minute'] and
-                len(self._hour) < RATE_LIMIT_CONFIG['requests_per_hour'])
+        with self._lock:
+            self._minute = [t for t in self._minute if now - t < timedelta(minutes=1)]
+            self._hour = [t for t in self._hour if now - t < timedelta(hours=1)]
+            return (len(self._minute) < RATE_LIMIT_CONFIG['requests_per_minute'] and
+                    len(self._hour) < RATE_LIMIT_CONFIG['requests_per_hour'])
+    def try_acquire(self) -> bool:
+        """Check the windows and record the request in one locked step.
+
+        Concurrent callers (week fan-out) cannot all pass the check before any
+        of them records; a granted slot counts even if the call later fails.
+        """
+        now = datetime.now()
+        with self._lock:
+            self._minute = [t for t in self._minute if now - t < timedelta(minutes=1)]
+            self._hour = [t for t in self._hour if now - t < timedelta(hours=1)]
+            if (len(self._minute) >= RATE_LIMIT_CONFIG['requests_per_minute'] or
+                    len(self._hour) >= RATE_LIMIT_CONFIG['requests_per_hour']):
+                return False
+            self._minute.append(now)
+            self._hour.append(now)
+            return True
     def record_request(self) -> None:
         now = datetime.now()
-        self._minute.append(now)
-        self._hour.append(now)
+        with self._lock:
+            self._minute.append(now)
+            self._hour.append(now)
 
     def reset(self) -> None:
-        self._minute.clear()
-        self._hour.clear()
+        with self._lock:
+            self._minute.clear()
+            self._hour.clear()
+
+class TokenBucket:
+    """Thread-safe token bucket (starts full; refills continuously at refill_rate tokens/sec)."""
+    def __init__(self, capacity: float, refill_rate: float):
+        self.capacity = float(capacity)
+        self.refill_rate = float(refill_rate)
+        self.tokens: float = float(capacity)
+        self.last_refill: float = time.monotonic()
+        self._lock = threading.Lock()
+    def try_consume(self, tokens: float = 1) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.refill_rate)
+            self.last_refill = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
 
 class FlightSearchValidator:
     @staticmethod
@@ -104,4 +145,4 @@ def parse_price(raw: Any) -> tuple[int | None, str | None]:
         return None, m.group('currency')
     return amt_int, m.group('currency')
 
-__all__ = ['RateLimiter','FlightSearchValidator','parse_price']
+__all__ = ['RateLimiter','TokenBucket','FlightSearchValidator','parse_price']
@@ -3,6 +3,10 @@
 Provides open_connection(db_path) that ensures:
 - Absolute path resolution (caller-friendly if relative)
 - Foreign key enforcement via PRAGMA
+- Per-connection tuning PRAGMAs from DATABASE_CONFIG['connection_pragmas']
+- A prepared-statement cache sized by DATABASE_CONFIG['cached_statements']
+
+and in_clause(values) for batch ``IN (...)`` lookups with bounded statement shapes.
 
 This centralizes connection initialization so all modules consistently
 apply integrity guarantees.
@@ -11,23 +15,65 @@ from __future__ import annotations
 
 import os
 import sqlite3
+from collections.abc import Sequence
+from typing import Any
 
-__all__ = ["open_connection"]
+__all__ = ["open_connection", "in_clause"]
 
-def open_connection(db_path: str) -> sqlite3.Connection:
+def open_connection(db_path: str, check_same_thread: bool = True) -> sqlite3.Connection:
     """Return a SQLite connection with foreign keys enforced.
 
     Note: Callers should use context manager semantics:
         with open_connection(path) as conn:
             ...
+    Long-lived connections shared across threads pass check_same_thread=False
+    and must serialize access themselves (e.g. with a Lock).
     """
     if not os.path.isabs(db_path):
         base = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
         db_path = os.path.normpath(os.path.join(base, db_path))
-    conn = sqlite3.connect(db_path)
+    conn = sqlite3.connect(db_path, check_same_thread=check_same_thread, cached_statements=_cached_statements())
     try:
         conn.execute("PRAGMA foreign_keys=ON")
     except Exception:
         # Non-fatal; continue even if pragma not applied (older SQLite compile)
         pass
+    for name, value in _connection_pragmas().items():
+        try:
+            conn.execute(f"PRAGMA {name}={value}")
+        except Exception:
+            pass
     return conn
+
+
+def _connection_pragmas() -> dict[str, Any]:
+    try:
+        from Main.config import DATABASE_CONFIG
+    except ImportError:  # pragma: no cover - standalone use without project config
+        return {}
+    return DATABASE_CONFIG.get('connection_pragmas', {})
+
+
+def _cached_statements() -> int:
+    try:
+        from Main.config import DATABASE_CONFIG
+    except ImportError:  # pragma: no cover - standalone use without project config
+        return 128
+    return int(DATABASE_CONFIG.get('cached_statements', 128))
+
+
+def in_clause(values: Sequence[Any], min_bucket: int = 8) -> tuple[str, list[Any]]:
+    """Return (placeholders, params) for ``col IN (...)`` padded to a power-of-two size.
+
+    Padding repeats the last value (harmless for IN) so the SQL text only ever
+    takes a handful of shapes (8, 16, 32, ...) and stays hot in the
+    connection's prepared-statement cache instead of compiling per length.
+    """
+    params = list(values)
+    if not params:
+        return '', params
+    size = min_bucket
+    while size < len(params):
+        size *= 2
+    params.extend([params[-1]] * (size - len(params)))
+    return ','.join('?' * size), params
@@ -0,0 +1,52 @@
+"""JSON serialization helpers.
+
+Uses orjson when it happens to be installed (it is not a declared dependency)
+and falls back to the stdlib encoder/decoder otherwise. ``dumps`` output is
+always ``str`` and always valid JSON; only whitespace / non-ASCII escaping
+differ between the two backends, which is irrelevant to every reader.
+``loads`` accepts ``str`` or ``bytes`` and returns the same objects either way.
+"""
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:  # optional accelerator
+    import orjson as _orjson  # type: ignore
+except ImportError:  # pragma: no cover - depends on environment
+    _orjson = None
+
+__all__ = ["dumps", "loads", "HAVE_ORJSON"]
+
+HAVE_ORJSON = _orjson is not None
+
+
+def dumps(obj: Any, *, indent: bool = False, compact: bool = False) -> str:
+    """Serialize obj to a JSON string (orjson fast path, stdlib fallback).
+
+    indent=True pretty-prints with two spaces; compact=True drops the stdlib's
+    separator spaces (orjson output is always compact).
+    """
+    if _orjson is not None:
+        option = _orjson.OPT_NON_STR_KEYS | (_orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            return _orjson.dumps(obj, option=option).decode('utf-8')
+        except TypeError:
+            # e.g. integers beyond 64-bit or unsupported types: let stdlib decide
+            pass
+    if indent:
+        return json.dumps(obj, indent=2)
+    if compact:
+        return json.dumps(obj, separators=(',', ':'))
+    return json.dumps(obj)
+
+
+def loads(data: str | bytes | bytearray) -> Any:
+    """Parse JSON text or UTF-8 bytes (orjson fast path, stdlib fallback)."""
+    if _orjson is not None:
+        try:
+            return _orjson.loads(data)
+        except _orjson.JSONDecodeError:
+            # orjson is stricter (e.g. NaN, lone surrogates); let stdlib decide
+            pass
+    return json.loads(data)
@@ -15,11 +15,16 @@ Notes:
     The client still contains CLI code and some legacy shims; future slimming
     can move CLI parsing + cleanup throttling into separate modules.
 """
-import json
+import atexit
 import logging
 import os
 import sqlite3
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 from datetime import datetime, timedelta
+from functools import lru_cache
 from time import perf_counter
 from typing import Any
 
@@ -36,8 +41,6 @@ if __name__ == "__main__":  # pragma: no cover (runtime convenience only)
     if parent not in _sys.path:
         _sys.path.insert(0, parent)
 
-import requests
-
 from Main.cache import FlightSearchCache
 from Main.config import RATE_LIMIT_CONFIG, SERPAPI_CONFIG, PROCESSING_CONFIG, get_api_key
 # Added service/persistence imports (Option C extraction)
@@ -55,11 +58,32 @@ except ImportError:  # pragma: no cover
         def insert_api_response(self, **kwargs):  # pragma: no cover
             return None
 
-from Main.core.common_validation import FlightSearchValidator, RateLimiter  # type: ignore
+from Main.core.common_validation import FlightSearchValidator, RateLimiter, TokenBucket  # type: ignore
+from Main.core.json_utils import dumps as _json_dumps  # type: ignore
 from Main.core.metrics import METRICS  # type: ignore
 from Main.core.structured_logging import log_event, log_exception  # type: ignore
 from Main.constants import Event, emit
 
+# clear_cache() is a no-op: nothing is cut off, so no cutoff timestamp is computed
+_DEPRECATED_CLEAR_CACHE_RESPONSE: dict[str, Any] = {'success': True, 'deleted_count': 0, 'cutoff_time': None, 'deprecated': True}
+
+
+# Clients with a live background writer pool; drained by the single exit hook below
+_PERSIST_CLIENTS: weakref.WeakSet['EnhancedFlightSearchClient'] = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_persistence_at_exit() -> None:
+    """Drain every client's current writer pool (pools are recreated after flush)."""
+    for client in list(_PERSIST_CLIENTS):
+        client.flush_persistence()
+
+
+@lru_cache(maxsize=1)
+def _log_clear_cache_deprecation() -> None:
+    """Warn once per process instead of on every (polled) clear_cache call."""
+    logging.getLogger(__name__).warning("clear_cache() is deprecated and performs no action (raw retention policy). Use session_cleanup.py for pruning.")
+
 
 class EnhancedFlightSearchClient:
     """Enhanced Flight Search Client with Local Database Cache"""
@@ -75,14 +99,22 @@ class EnhancedFlightSearchClient:
 
         # Initialize cache manager
         self.cache = FlightSearchCache(self.db_path)
-        # Throttle marker for periodic cleanup (epoch seconds)
-        self._last_cleanup_ts = None  # type: ignore
+        # Optional background persistence (PROCESSING_CONFIG['async_persistence'])
+        self._persist_async = bool(PROCESSING_CONFIG.get('async_persistence', False))
+        self._store_pool: ThreadPoolExecutor | None = None
+        self._store_pool_lock = threading.Lock()
+        self._store_slots = threading.BoundedSemaphore(max(1, int(PROCESSING_CONFIG.get('async_persistence_max_pending', 64))))
+        # Periodic cleanup schedule: one token per 15 minutes (first search runs it)
+        self._cleanup_bucket = TokenBucket(capacity=1, refill_rate=1 / 900)
 
         # Ensure supporting unique constraint for price_insights (logical 1:1)
         try:
             from Main.core.db_utils import open_connection as _open_conn
             with _open_conn(self.db_path) as _c:
                 _c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_price_insights_search_unique ON price_insights(search_id)")
+                # Stats queries (popular routes GROUP BY, 24h api_queries window); no-ops on the shipped schema
+                _c.execute("CREATE INDEX IF NOT EXISTS idx_flight_searches_airports ON flight_searches(departure_airport_code, arrival_airport_code)")
+                _c.execute("CREATE INDEX IF NOT EXISTS idx_created_at ON api_queries(created_at)")
         except Exception:
             pass
 
@@ -94,14 +126,15 @@ class EnhancedFlightSearchClient:
         self.retry_delay = SERPAPI_CONFIG['retry_delay']
 
         self.rate_limiter = RateLimiter() if RATE_LIMIT_CONFIG['enable_rate_limiting'] else None
-        self.session = requests.Session()
+        # Import original client for API calls
+        from serpapi_client import SerpAPIFlightClient, build_session  # local import
+        self.session = build_session()
 
         # Setup logging
         self.logger = logging.getLogger(__name__)
 
-        # Import original client for API calls
-        from serpapi_client import SerpAPIFlightClient  # local import
-        self.api_client = SerpAPIFlightClient(self.api_key) if self.api_key else None
+        # Share one keep-alive pool so repeated/week searches reuse warm TLS connections
+        self.api_client = SerpAPIFlightClient(self.api_key, session=self.session) if self.api_key else None
         # Service composition root (new)
         self._inbound_merge = InboundMergeStrategy(logging.getLogger(__name__))
         self._week_agg = WeekRangeAggregator(logging.getLogger(__name__))
@@ -148,44 +181,17 @@ class EnhancedFlightSearchClient:
         """
         op_start = perf_counter()
         # Throttled structured cache cleanup (at most every 15 minutes)
-        import time as _t
-        now = _t.time()
-        if (self._last_cleanup_ts is None) or (now - self._last_cleanup_ts > 900):
+        if self._cleanup_bucket.try_consume(1):
             self.cache.cleanup_old_data(max_cache_age_hours)
-            self._last_cleanup_ts = now
-        
-        # Build search parameters
-        search_params = {
-            'departure_id': departure_id,
-            'arrival_id': arrival_id,
-            'outbound_date': outbound_date,
-            'adults': adults,
-            'children': children,
-            'infants_in_seat': infants_in_seat,
-            'infants_on_lap': infants_on_lap,
-            'travel_class': travel_class,
-            'currency': currency
-        }
-        
-        # Auto-generate return date for round-trip searches to capture more data
-        if not one_way and not return_date:
-            from datetime import datetime, timedelta
-            try:
-                outbound_dt = datetime.strptime(outbound_date, '%Y-%m-%d')
-                # Default return date: 7 days after outbound for better data capture
-                return_dt = outbound_dt + timedelta(days=7)
-                return_date = return_dt.strftime('%Y-%m-%d')
-                self.logger.info(f"Auto-generated return date: {return_date} (7 days after outbound)")
-            except ValueError:
-                self.logger.warning(f"Could not parse outbound_date: {outbound_date}")
-        
-        # Always include return_date for round-trip searches (unless one-way explicit)
-        if not one_way and return_date:
-            search_params['return_date'] = return_date
-            
-        # Add additional parameters
-        search_params.update(kwargs)
         
+        search_params = self._build_search_params(
+            departure_id, arrival_id, outbound_date, return_date,
+            adults=adults, children=children, infants_in_seat=infants_in_seat,
+            infants_on_lap=infants_on_lap, travel_class=travel_class, currency=currency,
+            one_way=one_way, **kwargs
+        )
+        return_date = search_params.get('return_date', return_date)
+
         # Validate parameters
         is_valid, errors = self._validate_search_params(search_params)
         if not is_valid:
@@ -203,17 +209,11 @@ class EnhancedFlightSearchClient:
             self.logger.info("Checking local database cache...")
             cached_result = self.cache.search_cache(search_params, max_cache_age_hours)
             if cached_result:
-                self.logger.info(f"Using cached data from {cached_result['cache_timestamp']}")
+                self.logger.info("Using cached data from %s", cached_result['cache_timestamp'])
                 emit(Event.CACHE_HIT, log_event, search_id=cached_result.get('search_id'), cache_key=cache_key)
                 duration_ms = int((perf_counter() - op_start) * 1000)
                 emit(Event.SEARCH_SUCCESS, log_event, search_id=cached_result.get('search_id'), source='cache', duration_ms=duration_ms)
-                return {
-                    'success': True,
-                    'source': 'cache',
-                    'data': cached_result,
-                    'cache_age_hours': self._calculate_cache_age(cached_result['cache_timestamp']),
-                    'message': 'Data retrieved from local cache'
-                }
+                return self._cache_hit_response(cached_result)
             else:
                 emit(Event.CACHE_MISS, log_event, cache_key=cache_key)
 
@@ -247,47 +247,35 @@ class EnhancedFlightSearchClient:
 
             search_id = api_result.get('search_id')
             api_data = api_result.get('data')
-            api_query_id = None
+            raw_data = api_data
+
+            if self._persist_async:
+                # Inbound merge still runs inline (it shapes the returned data);
+                # both DB writes move to the background writer thread. The merge
+                # extends other_flights in place, so snapshot that list for the raw row.
+                if isinstance(api_data, dict) and 'other_flights' in api_data:
+                    raw_data = {**api_data, 'other_flights': list(api_data['other_flights'])}
+                api_data = self._ensure_inbound(api_data, search_params)
+                if search_id and api_data:
+                    self._submit_persist(search_id, search_params, raw_data, api_data)
+                duration_ms = int((perf_counter() - op_start) * 1000)
+                emit(Event.SEARCH_SUCCESS, log_event, search_id=search_id, source='api', duration_ms=duration_ms)
+                return {
+                    'success': True,
+                    'source': 'api',
+                    'data': api_data,
+                    'search_id': search_id,
+                    'message': 'Fresh data retrieved from API (persisting in background)'
+                }
 
             # Store raw API response first (non-fatal on failure)
-            try:
-                if search_id and api_data:
-                    dbh = SerpAPIDatabase(self.db_path)
-                    api_query_id = dbh.insert_api_response(
-                        query_parameters=search_params,
-                        raw_response=json.dumps(api_data),
-                        query_type='google_flights',
-                        status_code=200,
-                        api_endpoint='google_flights',
-                        search_term=f"{search_params.get('departure_id','')}-{search_params.get('arrival_id','')}"
-                    )
-                    emit(Event.STORE_RAW_SUCCESS, log_event, search_id=search_id, api_query_id=api_query_id)
-            except Exception as raw_err:
-                self.logger.error(f"Failed to store raw API response: {raw_err}")
-                log_exception(str(Event.STORE_RAW_ERROR), search_id=search_id, exc=raw_err)
+            api_query_id = self._store_raw(search_id, search_params, raw_data)
 
             # Inbound merge delegation (ensures inbound leg if missing)
-            try:
-                api_data = self._inbound_merge.ensure_inbound(api_data, search_params, self.api_client)
-            except Exception as _merge_err:  # pragma: no cover
-                self.logger.warning(f"Inbound merge strategy failure: {_merge_err}")
+            api_data = self._ensure_inbound(api_data, search_params)
 
             # Structured storage (non-fatal) via writer
-            try:
-                if search_id and api_data:
-                    # Use backward-compatible wrapper so tests that monkeypatch
-                    # _store_structured_data still trigger struct failure metrics.
-                    self._store_structured_data(search_id, search_params, api_data, api_query_id)
-                    self.logger.info(f"API call successful - stored complete flight data for search: {search_id}")
-            except Exception as struct_err:
-                self.logger.error(f"Structured storage failure: {struct_err}")
-                try:
-                    # Increment standardized metric counter for structured storage failures
-                    from .constants import Metric  # local import to avoid circulars at module import time
-                    METRICS.inc(Metric.STRUCTURED_STORAGE_FAILURES.value)
-                except Exception:  # pragma: no cover - metrics failure is non-fatal
-                    pass
-                log_exception(str(Event.STORE_STRUCTURED_ERROR), search_id=search_id, exc=struct_err)
+            self._store_structured_safe(search_id, search_params, api_data, api_query_id)
 
             # After storing, load back from DB so UI always reads a single, consistent shape
             try:
@@ -304,7 +292,7 @@ class EnhancedFlightSearchClient:
                 'message': 'Fresh data retrieved from API and normalized via DB' if db_view else 'Fresh data retrieved from API'
             }
         except Exception as e:
-            self.logger.error(f"API call failed: {str(e)}")
+            self.logger.error("API call failed: %s", e)
             log_exception(str(Event.SEARCH_ERROR), exc=e, cache_key=cache_key)
             return {
                 'success': False,
@@ -312,6 +300,41 @@ class EnhancedFlightSearchClient:
                 'source': 'api_exception'
             }
     
+    def search_cache_many(self,
+                          departure_id: str,
+                          arrival_id: str,
+                          outbound_dates: list[str],
+                          max_cache_age_hours: int = 24,
+                          force_api: bool = False,
+                          **kwargs) -> dict[str, dict[str, Any]]:
+        """Probe the cache for several outbound dates with a single lookup.
+
+        Builds the same parameter set search_flights would for every date and
+        resolves all cache keys in one batch query. Returns a mapping of
+        outbound date -> cache-hit response (same shape as search_flights);
+        dates that miss or fail validation are omitted so callers can route
+        only those to the API.
+        """
+        if force_api:
+            return {}
+        keys_by_date: dict[str, str] = {}
+        for outbound_date in outbound_dates:
+            params = self._build_search_params(departure_id, arrival_id, outbound_date, **kwargs)
+            if self._validate_search_params(params)[0]:
+                keys_by_date[outbound_date] = self.cache.generate_cache_key(params)
+        hits = self.cache.search_cache_many(list(keys_by_date.values()), max_cache_age_hours)
+        responses: dict[str, dict[str, Any]] = {}
+        now = datetime.now()
+        for outbound_date, cache_key in keys_by_date.items():
+            cached_result = hits.get(cache_key)
+            if not cached_result:
+                emit(Event.CACHE_MISS, log_event, cache_key=cache_key)
+                continue
+            emit(Event.CACHE_HIT, log_event, search_id=cached_result.get('search_id'), cache_key=cache_key)
+            emit(Event.SEARCH_SUCCESS, log_event, search_id=cached_result.get('search_id'), source='cache', duration_ms=0)
+            responses[outbound_date] = self._cache_hit_response(cached_result, now)
+        return responses
+
     def search_week_range(self, departure_id: str, arrival_id: str, start_date: str, **kwargs) -> dict[str, Any]:  # noqa: D401
         """Delegate to WeekRangeAggregator (extracted service)."""
         return self._week_agg.run_week(self, departure_id, arrival_id, start_date, **kwargs)
@@ -319,6 +342,83 @@ class EnhancedFlightSearchClient:
     def _analyze_week_price_trend(self, daily_results: dict) -> dict[str, Any]:  # pragma: no cover - legacy shim
         return self._week_agg._analyze_price_trend(daily_results)  # type: ignore[attr-defined]
 
+    # ---------------- Persistence helpers -----------------
+    def _store_raw(self, search_id: str | None, search_params: dict[str, Any], api_data: dict[str, Any] | None) -> int | None:
+        """Store the raw API payload in api_queries (non-fatal); returns its id."""
+        try:
+            if search_id and api_data:
+                dbh = SerpAPIDatabase(self.db_path)
+                api_query_id = dbh.insert_api_response(
+                    query_parameters=search_params,
+                    raw_response=_json_dumps(api_data),
+                    query_type='google_flights',
+                    status_code=200,
+                    api_endpoint='google_flights',
+                    search_term=f"{search_params.get('departure_id','')}-{search_params.get('arrival_id','')}"
+                )
+                emit(Event.STORE_RAW_SUCCESS, log_event, search_id=search_id, api_query_id=api_query_id)
+                return api_query_id
+        except Exception as raw_err:
+            self.logger.error("Failed to store raw API response: %s", raw_err)
+            log_exception(str(Event.STORE_RAW_ERROR), search_id=search_id, exc=raw_err)
+        return None
+
+    def _ensure_inbound(self, api_data: dict[str, Any] | None, search_params: dict[str, Any]) -> dict[str, Any] | None:
+        try:
+            return self._inbound_merge.ensure_inbound(api_data, search_params, self.api_client)
+        except Exception as _merge_err:  # pragma: no cover
+            self.logger.warning("Inbound merge strategy failure: %s", _merge_err)
+            return api_data
+
+    def _store_structured_safe(self, search_id: str | None, search_params: dict[str, Any], api_data: dict[str, Any] | None, api_query_id: int | None) -> None:
+        """Structured storage with failure metric/event (never raises)."""
+        try:
+            if search_id and api_data:
+                # Use backward-compatible wrapper so tests that monkeypatch
+                # _store_structured_data still trigger struct failure metrics.
+                self._store_structured_data(search_id, search_params, api_data, api_query_id)
+                self.logger.info("API call successful - stored complete flight data for search: %s", search_id)
+        except Exception as struct_err:
+            self.logger.error("Structured storage failure: %s", struct_err)
+            try:
+                # Increment standardized metric counter for structured storage failures
+                from .constants import Metric  # local import to avoid circulars at module import time
+                METRICS.inc(Metric.STRUCTURED_STORAGE_FAILURES.value)
+            except Exception:  # pragma: no cover - metrics failure is non-fatal
+                pass
+            log_exception(str(Event.STORE_STRUCTURED_ERROR), search_id=search_id, exc=struct_err)
+
+    def _persist(self, search_id: str, search_params: dict[str, Any], raw_data: dict[str, Any], api_data: dict[str, Any]) -> None:
+        api_query_id = self._store_raw(search_id, search_params, raw_data)
+        self._store_structured_safe(search_id, search_params, api_data, api_query_id)
+
+    def _submit_persist(self, search_id: str, search_params: dict[str, Any], raw_data: dict[str, Any], api_data: dict[str, Any]):
+        """Queue _persist on the single background writer (SQLite allows one writer anyway).
+
+        At most async_persistence_max_pending jobs wait in the queue; beyond
+        that the caller blocks until the writer catches up, so a slow disk
+        cannot grow memory without bound.
+        """
+        self._store_slots.acquire()
+        try:
+            with self._store_pool_lock:
+                if self._store_pool is None:
+                    self._store_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='efs-store')
+                    _PERSIST_CLIENTS.add(self)
+                future = self._store_pool.submit(self._persist, search_id, search_params, raw_data, api_data)
+        except BaseException:
+            self._store_slots.release()
+            raise
+        future.add_done_callback(lambda _f: self._store_slots.release())
+        return future
+
+    def flush_persistence(self) -> None:
+        """Block until queued background writes are done (no-op in sync mode)."""
+        with self._store_pool_lock:
+            pool, self._store_pool = self._store_pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
     def _store_structured_data(self, search_id: str, search_params: dict[str, Any], api_response: dict[str, Any], api_query_id: int | None):  # noqa: D401
         """Deprecated shim retained for backward compatibility in tests.
 
@@ -337,6 +437,61 @@ class EnhancedFlightSearchClient:
                 pass
             raise
 
+    # ---------------- Parameter / response helpers -----------------
+    def _build_search_params(self,
+                             departure_id: str,
+                             arrival_id: str,
+                             outbound_date: str,
+                             return_date: str | None = None,
+                             adults: int = 1,
+                             children: int = 0,
+                             infants_in_seat: int = 0,
+                             infants_on_lap: int = 0,
+                             travel_class: int = 1,
+                             currency: str = "USD",
+                             one_way: bool = False,
+                             **kwargs) -> dict[str, Any]:
+        """Assemble the normalized search parameter dict (shared by single and batch paths)."""
+        search_params = {
+            'departure_id': departure_id,
+            'arrival_id': arrival_id,
+            'outbound_date': outbound_date,
+            'adults': adults,
+            'children': children,
+            'infants_in_seat': infants_in_seat,
+            'infants_on_lap': infants_on_lap,
+            'travel_class': travel_class,
+            'currency': currency
+        }
+
+        # Auto-generate return date for round-trip searches to capture more data
+        if not one_way and not return_date:
+            try:
+                outbound_dt = datetime.strptime(outbound_date, '%Y-%m-%d')
+                # Default return date: 7 days after outbound for better data capture
+                return_dt = outbound_dt + timedelta(days=7)
+                return_date = return_dt.strftime('%Y-%m-%d')
+                self.logger.info("Auto-generated return date: %s (7 days after outbound)", return_date)
+            except ValueError:
+                self.logger.warning("Could not parse outbound_date: %s", outbound_date)
+
+        # Always include return_date for round-trip searches (unless one-way explicit)
+        if not one_way and return_date:
+            search_params['return_date'] = return_date
+
+        # Add additional parameters
+        search_params.update(kwargs)
+        return search_params
+
+    def _cache_hit_response(self, cached_result: dict[str, Any], now: datetime | None = None) -> dict[str, Any]:
+        return {
+            'success': True,
+            'source': 'cache',
+            'data': cached_result,
+            'cache_age_hours': self._calculate_cache_age(cached_result['cache_timestamp'], now),
+            'message': 'Data retrieved from local cache'
+        }
+
     # ---------------- Internal validation bridge -----------------
     def _validate_search_params(self, params: dict[str, Any]):
         """Wrapper to reuse common validation (kept separate for easy patching/testing)."""
@@ -346,17 +501,13 @@ class EnhancedFlightSearchClient:
         """DEPRECATED: Raw API retention is indefinite by default.
 
         This method no longer deletes raw api_queries automatically to honor the
-        authoritative retention policy. It now returns a no-op summary. If
+        authoritative retention policy. It now returns a no-op summary
+        (cutoff_time is None; the deprecation warning is logged once). If
         explicit raw pruning is required, use the dedicated session_cleanup.py
         utility with --raw-retention-days or --prune-raw-cache-age flags.
         """
-        self.logger.warning("clear_cache() is deprecated and performs no action (raw retention policy). Use session_cleanup.py for pruning.")
-        return {
-            'success': True,
-            'deleted_count': 0,
-            'cutoff_time': (datetime.now() - timedelta(hours=older_than_hours)).isoformat(),
-            'deprecated': True
-        }
+        _log_clear_cache_deprecation()
+        return dict(_DEPRECATED_CLEAR_CACHE_RESPONSE)
     
     def get_cache_stats(self) -> dict[str, Any]:
         """Get statistics about cached flight data.
@@ -366,49 +517,43 @@ class EnhancedFlightSearchClient:
         """
         try:
             from Main.core.db_utils import open_connection as _open_conn
-            with _open_conn(self.db_path) as conn:
-                cursor = conn.cursor()
-                # Total cached searches
-                cursor.execute("SELECT COUNT(*) FROM flight_searches")
-                total_searches = cursor.fetchone()[0]
-                
-                # Searches in last 24 hours (using api_queries.created_at authoritative)
-                yesterday = datetime.now() - timedelta(hours=24)
-                # Use created_at (authoritative) instead of query_timestamp for recent activity measure
-                cursor.execute("""
-                SELECT COUNT(*) FROM api_queries 
-                WHERE created_at > ?
-                """, (yesterday.isoformat(),))
-                recent_searches = cursor.fetchone()[0]
-
-                # Raw api_queries total + delta tracking
-                cursor.execute("SELECT COUNT(*) FROM api_queries")
-                raw_total = cursor.fetchone()[0]
+            with closing(_open_conn(self.db_path)) as conn:
+                # One read transaction: all counts come from the same snapshot
+                conn.execute("BEGIN")
+                try:
+                    total_searches = conn.execute("SELECT COUNT(*) FROM flight_searches").fetchone()[0]
+
+                    # Searches in last 24 hours (api_queries.created_at is authoritative)
+                    yesterday = datetime.now() - timedelta(hours=24)
+                    recent_searches = conn.execute(
+                        "SELECT COUNT(*) FROM api_queries WHERE created_at > ?", (yesterday.isoformat(),)
+                    ).fetchone()[0]
+
+                    # Raw api_queries total + delta tracking
+                    raw_total = conn.execute("SELECT COUNT(*) FROM api_queries").fetchone()[0]
+
+                    # Popular routes: GROUP BY is served by the covering
+                    # (departure_airport_code, arrival_airport_code[, outbound_date])
+                    # indexes, so no table scan or grouping sort is needed.
+                    try:
+                        popular_routes = conn.execute("""
+                        SELECT departure_airport_code, arrival_airport_code, COUNT(*) as search_count
+                        FROM flight_searches
+                        GROUP BY departure_airport_code, arrival_airport_code
+                        ORDER BY search_count DESC
+                        LIMIT 5
+                        """).fetchall()
+                    except sqlite3.Error:
+                        popular_routes = []
+                finally:
+                    conn.rollback()  # read-only; just release the snapshot
                 delta = None
                 if not hasattr(self, '_last_raw_total'):
                     self._last_raw_total = raw_total  # type: ignore[attr-defined]
                 else:
                     delta = raw_total - self._last_raw_total  # type: ignore[attr-defined]
                     self._last_raw_total = raw_total  # type: ignore[attr-defined]
-                
-                # Popular routes (defensive: only if columns exist)
-                popular_routes = []
-                try:
-                    cursor.execute("PRAGMA table_info(flight_searches)")
-                    cols = {row[1] for row in cursor.fetchall()}
-                    if {'departure_id','arrival_id'} <= cols:
-                        cursor.execute("""
-                        SELECT departure_id, arrival_id, COUNT(*) as search_count
-                        FROM flight_searches
-                        GROUP BY departure_id, arrival_id
-                        ORDER BY search_count DESC
-                        LIMIT 5
-                        """)
-                        popular_routes = cursor.fetchall()
-                except Exception:
-                    # silently ignore missing columns
-                    popular_routes = []
-                
+
                 return {
                     'total_cached_searches': total_searches,
                     'recent_searches_24h': recent_searches,
@@ -425,31 +570,31 @@ class EnhancedFlightSearchClient:
                 }
                 
         except Exception as e:
-            self.logger.error(f"Error getting cache stats: {str(e)}")
+            self.logger.error("Error getting cache stats: %s", e)
             return {'error': str(e)}
 
     # ---------------- Small utility helpers -----------------
-    def _calculate_cache_age(self, cache_timestamp: str) -> float:
+    def _calculate_cache_age(self, cache_timestamp: str, now: datetime | None = None) -> float:
         """Return cache age in hours given an ISO timestamp string.
 
         Accepts naive or aware ISO-8601 strings. Naive values are treated as
         local time (consistent with how created_at is currently stored).
-        Falls back to 0.0 hours on parse errors.
+        ``now`` (naive local) may be supplied by batch callers to share one
+        clock read. Falls back to 0.0 hours on parse errors.
         """
         try:
-            # Handle common 'Z' suffix if present
-            ts = cache_timestamp.replace('Z', '+00:00') if isinstance(cache_timestamp, str) else cache_timestamp
-            dt = datetime.fromisoformat(ts)
+            # Fast path: well-formed ISO strings (what created_at stores) parse directly
+            dt = datetime.fromisoformat(cache_timestamp)
         except Exception:
             try:
-                # Last-resort: some ISO strings may use space separator
-                dt = datetime.fromisoformat(str(cache_timestamp).strip().replace(' ', 'T'))
+                # Handle 'Z' suffix / space separator variants
+                dt = datetime.fromisoformat(str(cache_timestamp).strip().replace('Z', '+00:00').replace(' ', 'T'))
             except Exception:
                 return 0.0
         try:
             if dt.tzinfo is None:
                 # Naive -> assume local clock
-                age_hours = (datetime.now() - dt).total_seconds() / 3600.0
+                age_hours = ((now or datetime.now()) - dt).total_seconds() / 3600.0
             else:
                 # Aware -> compare in the same tz
                 age_hours = (datetime.now(dt.tzinfo) - dt).total_seconds() / 3600.0
@@ -14,98 +14,232 @@ from warnings import warn as _warn
 
 _warn(DeprecationWarning("flight_processor module is deprecated; use EnhancedFlightSearchClient instead."), stacklevel=2)
 
-import json
 import logging
 import os
 import sqlite3
-import sys
+import threading
 from datetime import datetime
+from sys import intern as _intern
 from typing import Any
 
-# Add DB directory to path for imports
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'DB'))
-
 try:
-    from database_helper import SerpAPIDatabase
-except ImportError:
-    # Fallback if import fails
-    class SerpAPIDatabase:
-        def __init__(self, db_path):
-            self.db_path = db_path
-        def insert_api_response(self, **kwargs):
-            return 1  # Mock return for testing
+    from Main.core.db_utils import in_clause, open_connection  # type: ignore
+    from Main.core.json_utils import dumps as _json_dumps  # type: ignore
+    from Main.core.json_utils import loads as _json_loads  # type: ignore
+except ImportError:  # pragma: no cover - direct execution from Main/ (project root not on sys.path)
+    from core.db_utils import in_clause, open_connection  # type: ignore
+    from core.json_utils import dumps as _json_dumps  # type: ignore
+    from core.json_utils import loads as _json_loads  # type: ignore
+
+_FLIGHT_RESULT_VALUES = "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_INSERT_FLIGHT_RESULTS = """
+    INSERT INTO flight_results 
+    (search_id, result_type, result_rank, total_duration, total_price, 
+     price_currency, flight_type, layover_count, carbon_emissions_flight,
+     carbon_emissions_typical, carbon_emissions_difference_percent,
+     departure_token, booking_token, airline_logo_url)
+    VALUES {values}
+"""
+_INSERT_FLIGHT_RESULTS_RETURNING = _INSERT_FLIGHT_RESULTS + "RETURNING id, result_type, result_rank"
+_FLIGHT_ROWS_PER_INSERT = 500  # 14 params/row, well under SQLite's variable limit
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+_FLIGHT_GROUPS = (('best_flights', 'best_flight'), ('other_flights', 'other_flight'))
+
+# Fixed SQL lives at module level so every call hands sqlite3 the same string
+# object and hits its statement cache instead of re-preparing.
+_INSERT_FLIGHT_SEARCH = """
+    INSERT INTO flight_searches 
+    (search_id, search_timestamp, departure_id, arrival_id, outbound_date, 
+     return_date, flight_type, adults, children, infants_in_seat, infants_on_lap,
+     travel_class, currency, country_code, language_code, max_price, stops,
+     deep_search, show_hidden, raw_parameters, response_status, total_results, api_query_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_INSERT_SEGMENTS = """
+    INSERT INTO flight_segments 
+    (flight_result_id, segment_order, departure_airport_id, departure_airport_name,
+     departure_time, arrival_airport_id, arrival_airport_name, arrival_time,
+     duration_minutes, airplane_model, airline_code, airline_name, airline_logo_url,
+     flight_number, travel_class, legroom, is_overnight, often_delayed,
+     ticket_also_sold_by, extensions, plane_and_crew_by)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_INSERT_LAYOVERS = """
+    INSERT INTO layovers 
+    (flight_result_id, layover_order, airport_id, airport_name, 
+     duration_minutes, is_overnight)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+_UPSERT_AIRLINES = """
+    INSERT INTO airlines 
+    (airline_code, airline_name, logo_url, last_seen)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(airline_code) DO UPDATE SET
+        airline_name = excluded.airline_name,
+        logo_url = excluded.logo_url,
+        last_seen = excluded.last_seen
+"""
+_INSERT_PRICE_INSIGHTS = """
+    INSERT INTO price_insights 
+    (search_id, lowest_price, price_level, typical_price_low, 
+     typical_price_high, price_history)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+_UPSERT_ROUTE_ANALYTICS = """
+    INSERT INTO route_analytics 
+    (route_key, departure_airport, arrival_airport, total_searches, 
+     avg_price, min_price, max_price, last_search_date, updated_at)
+    VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?)
+    ON CONFLICT(route_key) DO UPDATE SET
+        total_searches = total_searches + 1,
+        avg_price = excluded.avg_price,
+        min_price = excluded.min_price,
+        max_price = excluded.max_price,
+        last_search_date = excluded.last_search_date,
+        updated_at = excluded.updated_at
+"""
+
+def _walk_flights(response: dict[str, Any]):
+    """Yield (result_type, rank, flight) over best_flights then other_flights."""
+    for group, result_type in _FLIGHT_GROUPS:
+        for rank, flight in enumerate(response.get(group) or [], 1):
+            yield result_type, rank, flight
 
 class FlightDataProcessor:
     """Processes flight search results and stores in database"""
     
-    def __init__(self, db_path: str = "../DB/Main_DB.db"):
-        """Initialize the processor"""
+    def __init__(self, db_path: str = "../DB/Main_DB.db", db_helper_cls: type | None = None):
+        """Initialize the processor
+
+        Args:
+            db_path: SQLite database path
+            db_helper_cls: raw-storage helper class (defaults to DB.database_helper.SerpAPIDatabase;
+                tests may inject a stand-in)
+        """
+        # The module-level warning fires once per process (and only on first
+        # import); flag every instantiation of the per-row legacy write path.
+        _warn(DeprecationWarning("FlightDataProcessor is deprecated; structured storage lives in "
+                                 "Main.persistence.structured_writer.StructuredFlightWriter."), stacklevel=2)
         self.db_path = db_path
         self.logger = logging.getLogger(__name__)
-        self.serpapi_db = SerpAPIDatabase(db_path)
+        if db_helper_cls is None:
+            from DB.database_helper import SerpAPIDatabase as db_helper_cls  # type: ignore
+        self.serpapi_db = db_helper_cls(db_path)
+        # One connection for the processor's lifetime (helpers used to open and
+        # close their own per call, i.e. per flight result). open_connection
+        # applies foreign_keys and DATABASE_CONFIG's pragmas / statement cache;
+        # the connection is shared across threads, so callers serialize on self._lock.
+        # abspath keeps relative paths cwd-based, matching the raw-storage helper.
+        self._conn = open_connection(os.path.abspath(db_path), check_same_thread=False)
+        self._lock = threading.Lock()
+        # airline_code -> (name, logo_url) last upserted on this connection
+        self._airlines_seen: dict[str, tuple[Any, Any]] = {}
+
+    def close(self) -> None:
+        """Close the processor's database connection."""
+        self._conn.close()
+
+    def __enter__(self) -> "FlightDataProcessor":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
     
+    @staticmethod
+    def parse_raw(raw: str | bytes) -> dict[str, Any]:
+        """Parse a raw SerpAPI response body into the dict `process_search_response` expects."""
+        return _json_loads(raw)
+
     def process_search_response(self, search_result: dict[str, Any]) -> dict[str, Any]:
         """
         Process complete search response and store all data
         
         Args:
-            search_result: Complete response from SerpAPI client
+            search_result: Complete response from SerpAPI client. May carry
+                ``raw_response_bytes`` (the undecoded body) so the raw record
+                stores it verbatim instead of re-serializing ``raw_response``.
+                No producer exists yet: SerpAPIFlightClient returns only the
+                parsed dict, so current callers take the dumps() path.
             
         Returns:
             Dict with processing results and statistics
         """
         
-        try:
-            search_id = search_result['search_id']
-            raw_response = search_result['raw_response']
-            search_params = search_result['search_parameters']
+        with self._lock:  # one ingest at a time on the shared connection
+            try:
+                search_id = search_result['search_id']
+                raw_response = search_result['raw_response']
+                search_params = search_result['search_parameters']
+                # "DEP-ARR": api_queries.search_term and route_analytics.route_key
+                route_key = f"{search_params.get('departure_id', '')}-{search_params.get('arrival_id', '')}"
             
-            # Store raw API data first (maintains existing requirement)
-            api_record_id = self._store_raw_api_data(search_result)
+                # Store raw API data first (maintains existing requirement)
+                api_record_id = self._store_raw_api_data(search_result, route_key)
             
-            # Process structured data if response is valid
-            processing_stats = {
-                'search_id': search_id,
-                'api_record_id': api_record_id,
-                'flights_processed': 0,
-                'airlines_extracted': 0,
-                'errors': []
-            }
+                # Process structured data if response is valid
+                processing_stats = {
+                    'search_id': search_id,
+                    'api_record_id': api_record_id,
+                    'flights_processed': 0,
+                    'airlines_extracted': 0,
+                    'errors': []
+                }
             
-            if raw_response and 'search_metadata' in raw_response:
-                # Store flight search record
-                self._store_flight_search(search_id, search_params, raw_response, api_record_id)
-                
-                # Process flight results
-                flights_stats = self._process_flight_results(search_id, raw_response)
-                processing_stats.update(flights_stats)
-                
-                # Extract and store airlines
-                airline_count = self._extract_airlines(raw_response)
-                processing_stats['airlines_extracted'] = airline_count
-                
-                # Store price insights
-                self._store_price_insights(search_id, raw_response)
-                
-                # Update route analytics
-                self._update_route_analytics(search_params, raw_response)
+                if raw_response and 'search_metadata' in raw_response:
+                    # All structured writes share one transaction (one commit/fsync
+                    # per response); any failure rolls the whole response back.
+                    self._conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        # One timestamp for every row written for this response
+                        now_iso = datetime.now().isoformat()
+
+                        # One walk over best/other flights feeds every table below
+                        rows = self._collect_rows(search_id, raw_response, now_iso)
+
+                        # Store flight search record
+                        self._store_flight_search(search_id, search_params, raw_response, api_record_id,
+                                                  len(rows['flight_rows']), now_iso)
+
+                        # Process flight results
+                        flights_stats = self._process_flight_results(rows)
+                        processing_stats.update(flights_stats)
+
+                        # Extract and store airlines
+                        airline_count = self._extract_airlines(rows['airline_rows'])
+                        processing_stats['airlines_extracted'] = airline_count
+
+                        # Store price insights
+                        self._store_price_insights(search_id, raw_response)
+
+                        # Update route analytics
+                        self._update_route_analytics(search_params, rows['price_stats'], now_iso, route_key)
+                        self._conn.commit()
+                    except Exception:
+                        self._conn.rollback()
+                        self._airlines_seen.clear()  # may hold rows that were just rolled back
+                        raise
                 
-            self.logger.info(f"Successfully processed search {search_id}")
-            return processing_stats
+                self.logger.info("Successfully processed search %s", search_id)
+                return processing_stats
             
-        except Exception as e:
-            self.logger.error(f"Error processing search response: {e}")
-            processing_stats['errors'].append(str(e))
-            return processing_stats
+            except Exception as e:
+                self.logger.error("Error processing search response: %s", e)
+                processing_stats['errors'].append(str(e))
+                return processing_stats
     
-    def _store_raw_api_data(self, search_result: dict[str, Any]) -> int:
+    def _store_raw_api_data(self, search_result: dict[str, Any], search_term: str) -> int:
         """Store raw API data using existing database helper"""
         
         query_params = search_result['search_parameters']
-        raw_response = json.dumps(search_result['raw_response']) if search_result['raw_response'] else "{}"
-        
-        # Determine search term
-        search_term = f"{query_params.get('departure_id', '')}-{query_params.get('arrival_id', '')}"
+        raw_bytes = search_result.get('raw_response_bytes')
+        if raw_bytes is not None:
+            # Original body: exact fidelity, no dumps() of the parsed dict. Decoded
+            # so api_queries.raw_response stays TEXT for every existing reader.
+            raw_response = raw_bytes.decode('utf-8') if isinstance(raw_bytes, bytes | bytearray) else raw_bytes
+        elif search_result['raw_response']:
+            raw_response = _json_dumps(search_result['raw_response'])
+        else:
+            raw_response = "{}"
         
         return self.serpapi_db.insert_api_response(
             query_parameters=query_params,
@@ -117,143 +251,150 @@ class FlightDataProcessor:
         )
     
     def _store_flight_search(self, search_id: str, params: dict[str, Any], 
-                           response: dict[str, Any], api_record_id: int):
+                           response: dict[str, Any], api_record_id: int, total_results: int, now_iso: str):
         """Store flight search record"""
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        # Extract search parameters
+        get = params.get  # bound once; many lookups below
+        search_data = (
+            search_id,
+            now_iso,
+            get('departure_id'),
+            get('arrival_id'),
+            get('outbound_date'),
+            get('return_date'),
+            get('type', 1),
+            get('adults', 1),
+            get('children', 0),
+            get('infants_in_seat', 0),
+            get('infants_on_lap', 0),
+            get('travel_class', 1),
+            get('currency', 'USD'),
+            get('gl', 'us'),
+            get('hl', 'en'),
+            get('max_price'),
+            get('stops'),
+            get('deep_search', False),
+            get('show_hidden', False),
+            _json_dumps(params),
+            response.get('search_metadata', {}).get('status', 'Unknown'),
+            total_results,
+            api_record_id
+        )
         
-        try:
-            # Count total results
-            total_results = 0
-            if 'best_flights' in response:
-                total_results += len(response['best_flights'])
-            if 'other_flights' in response:
-                total_results += len(response['other_flights'])
-            
-            # Extract search parameters
-            search_data = (
-                search_id,
-                datetime.now().isoformat(),
-                params.get('departure_id'),
-                params.get('arrival_id'),
-                params.get('outbound_date'),
-                params.get('return_date'),
-                params.get('type', 1),
-                params.get('adults', 1),
-                params.get('children', 0),
-                params.get('infants_in_seat', 0),
-                params.get('infants_on_lap', 0),
-                params.get('travel_class', 1),
-                params.get('currency', 'USD'),
-                params.get('gl', 'us'),
-                params.get('hl', 'en'),
-                params.get('max_price'),
-                params.get('stops'),
-                params.get('deep_search', False),
-                params.get('show_hidden', False),
-                json.dumps(params),
-                response.get('search_metadata', {}).get('status', 'Unknown'),
-                total_results,
-                api_record_id
-            )
-            
-            cursor.execute("""
-                INSERT INTO flight_searches 
-                (search_id, search_timestamp, departure_id, arrival_id, outbound_date, 
-                 return_date, flight_type, adults, children, infants_in_seat, infants_on_lap,
-                 travel_class, currency, country_code, language_code, max_price, stops,
-                 deep_search, show_hidden, raw_parameters, response_status, total_results, api_query_id)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, search_data)
-            
-            conn.commit()
-            
-        finally:
-            conn.close()
+        self._conn.execute(_INSERT_FLIGHT_SEARCH, search_data)
     
-    def _process_flight_results(self, search_id: str, response: dict[str, Any]) -> dict[str, int]:
-        """Process flight results and store in database"""
-        
-        flights_processed = 0
-        
-        # Process best flights
-        if 'best_flights' in response:
-            for rank, flight in enumerate(response['best_flights'], 1):
-                self._store_flight_result(search_id, flight, 'best_flight', rank)
-                flights_processed += 1
-        
-        # Process other flights
-        if 'other_flights' in response:
-            for rank, flight in enumerate(response['other_flights'], 1):
-                self._store_flight_result(search_id, flight, 'other_flight', rank)
-                flights_processed += 1
-        
-        return {'flights_processed': flights_processed}
+    def _collect_rows(self, search_id: str, response: dict[str, Any], now_iso: str) -> dict[str, Any]:
+        """Build every row for one response in a single walk over its flights.
+
+        Segment and layover rows carry the flight's index into ``flight_rows``
+        in place of ``flight_result_id``; `_process_flight_results` swaps in the
+        real id once the flights are inserted.
+        """
+
+        flight_rows = []
+        segment_rows = []
+        layover_rows = []
+        airline_rows = {}  # first occurrence of a code wins
+        price_count = price_sum = 0
+        price_min = price_max = None
+        for index, (result_type, rank, flight) in enumerate(_walk_flights(response)):
+            flight_rows.append(self._flight_result_row(search_id, flight, result_type, rank))
+            if 'price' in flight:
+                # Running count/sum/min/max: no price list, one pass
+                price = flight['price']
+                price_count += 1
+                price_sum += price
+                if price_count == 1:
+                    price_min = price_max = price
+                elif price < price_min:
+                    price_min = price
+                elif price > price_max:
+                    price_max = price
+            for order, segment in enumerate(flight.get('flights') or [], 1):
+                segment_rows.append(self._segment_row(index, segment, order))
+                airline_code = segment.get('airline_code')
+                if isinstance(airline_code, str):
+                    airline_code = _intern(airline_code)  # few distinct codes, many sightings
+                if airline_code and airline_code not in airline_rows:
+                    airline_rows[airline_code] = self._airline_row(
+                        airline_code, segment.get('airline'), segment.get('airline_logo'), now_iso)
+            for order, layover in enumerate(flight.get('layovers') or [], 1):
+                layover_rows.append(self._layover_row(index, layover, order))
+
+        return {
+            'flight_rows': flight_rows,
+            'segment_rows': segment_rows,
+            'layover_rows': layover_rows,
+            'airline_rows': airline_rows,
+            'price_stats': (price_count, price_sum, price_min, price_max),
+        }
+
+    def _process_flight_results(self, rows: dict[str, Any]) -> dict[str, int]:
+        """Store flight results, segments and layovers (batched per table)"""
+
+        flight_rows = rows['flight_rows']
+        if not flight_rows:
+            return {'flights_processed': 0}
+
+        # Multi-row INSERT ... RETURNING hands back every new id in one
+        # statement per chunk; RETURNING order is unspecified, so key by (type, rank)
+        conn = self._conn
+        result_ids: dict[tuple[str, int], int] = {}
+        if _HAS_RETURNING:
+            for start in range(0, len(flight_rows), _FLIGHT_ROWS_PER_INSERT):
+                chunk = flight_rows[start:start + _FLIGHT_ROWS_PER_INSERT]
+                returned = conn.execute(
+                    _INSERT_FLIGHT_RESULTS_RETURNING.format(values=','.join([_FLIGHT_RESULT_VALUES] * len(chunk))),
+                    [value for row in chunk for value in row]
+                ).fetchall()
+                result_ids.update({(r[1], r[2]): r[0] for r in returned})
+        else:  # SQLite < 3.35: no RETURNING
+            for row in flight_rows:
+                result_ids[(row[1], row[2])] = conn.execute(
+                    _INSERT_FLIGHT_RESULTS.format(values=_FLIGHT_RESULT_VALUES), row).lastrowid
+        ids_by_index = [result_ids[(row[1], row[2])] for row in flight_rows]
+
+        if rows['segment_rows']:
+            conn.executemany(_INSERT_SEGMENTS,
+                             ((ids_by_index[row[0]],) + row[1:] for row in rows['segment_rows']))
+        if rows['layover_rows']:
+            conn.executemany(_INSERT_LAYOVERS,
+                             ((ids_by_index[row[0]],) + row[1:] for row in rows['layover_rows']))
+
+        return {'flights_processed': len(flight_rows)}
     
-    def _store_flight_result(self, search_id: str, flight_data: dict[str, Any], 
-                           result_type: str, rank: int):
-        """Store individual flight result"""
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            # Extract flight result data
-            carbon_emissions = flight_data.get('carbon_emissions', {})
-            
-            flight_result_data = (
-                search_id,
-                result_type,
-                rank,
-                flight_data.get('total_duration'),
-                flight_data.get('price'),
-                flight_data.get('currency', 'USD'),
-                flight_data.get('type'),
-                len(flight_data.get('layovers', [])),
-                carbon_emissions.get('this_flight'),
-                carbon_emissions.get('typical_for_this_route'),
-                carbon_emissions.get('difference_percent'),
-                flight_data.get('departure_token'),
-                flight_data.get('booking_token'),
-                flight_data.get('airline_logo')
-            )
-            
-            cursor.execute("""
-                INSERT INTO flight_results 
-                (search_id, result_type, result_rank, total_duration, total_price, 
-                 price_currency, flight_type, layover_count, carbon_emissions_flight,
-                 carbon_emissions_typical, carbon_emissions_difference_percent,
-                 departure_token, booking_token, airline_logo_url)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, flight_result_data)
-            
-            flight_result_id = cursor.lastrowid
-            
-            # Store flight segments
-            if 'flights' in flight_data:
-                for order, segment in enumerate(flight_data['flights'], 1):
-                    self._store_flight_segment(cursor, flight_result_id, segment, order)
-            
-            # Store layovers
-            if 'layovers' in flight_data:
-                for order, layover in enumerate(flight_data['layovers'], 1):
-                    self._store_layover(cursor, flight_result_id, layover, order)
-            
-            conn.commit()
-            
-        finally:
-            conn.close()
+    def _flight_result_row(self, search_id: str, flight_data: dict[str, Any],
+                           result_type: str, rank: int) -> tuple:
+        """Build the flight_results row for one flight"""
+        
+        carbon_emissions = flight_data.get('carbon_emissions', {})
+        
+        return (
+            search_id,
+            result_type,
+            rank,
+            flight_data.get('total_duration'),
+            flight_data.get('price'),
+            flight_data.get('currency', 'USD'),
+            flight_data.get('type'),
+            len(flight_data.get('layovers', [])),
+            carbon_emissions.get('this_flight'),
+            carbon_emissions.get('typical_for_this_route'),
+            carbon_emissions.get('difference_percent'),
+            flight_data.get('departure_token'),
+            flight_data.get('booking_token'),
+            flight_data.get('airline_logo')
+        )
     
-    def _store_flight_segment(self, cursor, flight_result_id: int, 
-                            segment: dict[str, Any], order: int):
-        """Store individual flight segment"""
+    def _segment_row(self, flight_index: int, segment: dict[str, Any], order: int) -> tuple:
+        """Build the flight_segments row for one segment (keyed by flight index)"""
         
         departure_airport = segment.get('departure_airport', {})
         arrival_airport = segment.get('arrival_airport', {})
         
-        segment_data = (
-            flight_result_id,
+        return (
+            flight_index,
             order,
             departure_airport.get('id'),
             departure_airport.get('name'),
@@ -271,88 +412,52 @@ class FlightDataProcessor:
             segment.get('legroom'),
             segment.get('overnight', False),
             segment.get('often_delayed_by_over_30_min', False),
-            json.dumps(segment.get('ticket_also_sold_by', [])),
-            json.dumps(segment.get('extensions', [])),
+            _json_dumps(segment.get('ticket_also_sold_by', [])),
+            _json_dumps(segment.get('extensions', [])),
             segment.get('plane_and_crew_by')
         )
-        
-        cursor.execute("""
-            INSERT INTO flight_segments 
-            (flight_result_id, segment_order, departure_airport_id, departure_airport_name,
-             departure_time, arrival_airport_id, arrival_airport_name, arrival_time,
-             duration_minutes, airplane_model, airline_code, airline_name, airline_logo_url,
-             flight_number, travel_class, legroom, is_overnight, often_delayed,
-             ticket_also_sold_by, extensions, plane_and_crew_by)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, segment_data)
     
-    def _store_layover(self, cursor, flight_result_id: int, 
-                      layover: dict[str, Any], order: int):
-        """Store layover information"""
+    def _layover_row(self, flight_index: int, layover: dict[str, Any], order: int) -> tuple:
+        """Build the layovers row for one layover (keyed by flight index)"""
         
-        layover_data = (
-            flight_result_id,
+        return (
+            flight_index,
             order,
             layover.get('id'),
             layover.get('name'),
             layover.get('duration'),
             layover.get('overnight', False)
         )
-        
-        cursor.execute("""
-            INSERT INTO layovers 
-            (flight_result_id, layover_order, airport_id, airport_name, 
-             duration_minutes, is_overnight)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, layover_data)
     
-    def _extract_airlines(self, response: dict[str, Any]) -> int:
-        """Extract and store airline information"""
-        
-        airlines_stored = 0
-        airlines_seen = set()
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            # Extract from flight segments
-            for flight_group in ['best_flights', 'other_flights']:
-                if flight_group in response:
-                    for flight in response[flight_group]:
-                        if 'flights' in flight:
-                            for segment in flight['flights']:
-                                airline_code = segment.get('airline_code')
-                                airline_name = segment.get('airline')
-                                airline_logo = segment.get('airline_logo')
-                                
-                                if airline_code and airline_code not in airlines_seen:
-                                    self._store_airline(cursor, airline_code, airline_name, airline_logo)
-                                    airlines_seen.add(airline_code)
-                                    airlines_stored += 1
-            
-            conn.commit()
-            
-        finally:
-            conn.close()
-        
-        return airlines_stored
+    def _extract_airlines(self, airline_rows: dict[str, tuple]) -> int:
+        """Store airline information collected from the flight segments (one executemany)"""
+        
+        # Airlines already upserted unchanged earlier in this session only need
+        # last_seen moved forward: one UPDATE instead of a row upsert each
+        seen = self._airlines_seen
+        changed = []
+        unchanged = []
+        for code, row in airline_rows.items():
+            (unchanged if seen.get(code) == row[1:3] else changed).append(row)
+        if changed:
+            self._conn.executemany(_UPSERT_AIRLINES, changed)
+            seen.update((row[0], row[1:3]) for row in changed)
+        if unchanged:
+            placeholders, codes = in_clause(sorted(row[0] for row in unchanged))
+            self._conn.execute(f"UPDATE airlines SET last_seen = ? WHERE airline_code IN ({placeholders})",
+                               [unchanged[0][3], *codes])
+        
+        return len(airline_rows)
     
-    def _store_airline(self, cursor, code: str, name: str, logo_url: str):
-        """Store individual airline information"""
+    def _airline_row(self, code: str, name: str, logo_url: str, now_iso: str) -> tuple:
+        """Build the airlines row for one airline"""
         
-        airline_data = (
+        return (
             code,
             name,
             logo_url,
-            datetime.now().isoformat()
+            now_iso
         )
-        
-        cursor.execute("""
-            INSERT OR REPLACE INTO airlines 
-            (airline_code, airline_name, logo_url, last_seen)
-            VALUES (?, ?, ?, ?)
-        """, airline_data)
     
     def _store_price_insights(self, search_id: str, response: dict[str, Any]):
         """Store price insights data"""
@@ -362,34 +467,21 @@ class FlightDataProcessor:
         
         price_insights = response['price_insights']
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        typical_range = price_insights.get('typical_price_range', [])
         
-        try:
-            typical_range = price_insights.get('typical_price_range', [])
-            
-            insights_data = (
-                search_id,
-                price_insights.get('lowest_price'),
-                price_insights.get('price_level'),
-                typical_range[0] if len(typical_range) > 0 else None,
-                typical_range[1] if len(typical_range) > 1 else None,
-                json.dumps(price_insights.get('price_history', []))
-            )
-            
-            cursor.execute("""
-                INSERT INTO price_insights 
-                (search_id, lowest_price, price_level, typical_price_low, 
-                 typical_price_high, price_history)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, insights_data)
-            
-            conn.commit()
-            
-        finally:
-            conn.close()
+        insights_data = (
+            search_id,
+            price_insights.get('lowest_price'),
+            price_insights.get('price_level'),
+            typical_range[0] if len(typical_range) > 0 else None,
+            typical_range[1] if len(typical_range) > 1 else None,
+            _json_dumps(price_insights.get('price_history', []))
+        )
+        
+        self._conn.execute(_INSERT_PRICE_INSIGHTS, insights_data)
     
-    def _update_route_analytics(self, params: dict[str, Any], response: dict[str, Any]):
+    def _update_route_analytics(self, params: dict[str, Any], price_stats: tuple[int, Any, Any, Any],
+                                now_iso: str, route_key: str):
         """Update route analytics data"""
         
         departure_id = params.get('departure_id')
@@ -398,43 +490,16 @@ class FlightDataProcessor:
         if not departure_id or not arrival_id:
             return
         
-        route_key = f"{departure_id}-{arrival_id}"
-        
-        # Calculate average price from results
-        prices = []
-        for flight_group in ['best_flights', 'other_flights']:
-            if flight_group in response:
-                for flight in response[flight_group]:
-                    if 'price' in flight:
-                        prices.append(flight['price'])
-        
-        if not prices:
+        price_count, price_sum, min_price, max_price = price_stats
+        if not price_count:
             return
         
-        avg_price = sum(prices) // len(prices)
-        min_price = min(prices)
-        max_price = max(prices)
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        avg_price = price_sum // price_count
         
-        try:
-            # Update or insert route analytics
-            cursor.execute("""
-                INSERT OR REPLACE INTO route_analytics 
-                (route_key, departure_airport, arrival_airport, total_searches, 
-                 avg_price, min_price, max_price, last_search_date, updated_at)
-                VALUES (?, ?, ?, 
-                        COALESCE((SELECT total_searches FROM route_analytics WHERE route_key = ?) + 1, 1),
-                        ?, ?, ?, ?, ?)
-            """, (route_key, departure_id, arrival_id, route_key, 
-                  avg_price, min_price, max_price, 
-                  params.get('outbound_date'), datetime.now().isoformat()))
-            
-            conn.commit()
-            
-        finally:
-            conn.close()
+        # Update or insert route analytics
+        self._conn.execute(_UPSERT_ROUTE_ANALYTICS, (route_key, departure_id, arrival_id,
+                                                     avg_price, min_price, max_price, 
+                                                     params.get('outbound_date'), now_iso))
 
 def test_processor():
     """Test the flight data processor"""
@@ -502,4 +567,10 @@ def test_processor():
         return False
 
 if __name__ == "__main__":
+    # Direct execution from Main/ needs the project root for the DB.database_helper
+    # import (same adjustment as enhanced_flight_search); library imports untouched.
+    import sys as _sys
+    _parent = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if _parent not in _sys.path:
+        _sys.path.insert(0, _parent)
     test_processor()
@@ -6,7 +6,8 @@ Usage:
 """
 from __future__ import annotations
 
-import argparse, json
+import argparse
+from Main.core.json_utils import dumps  # type: ignore
 from Main.core.metrics import METRICS  # type: ignore
 
 def main():
@@ -15,9 +16,9 @@ def main():
     args = p.parse_args()
     snap = METRICS.snapshot()
     if args.raw:
-        print(json.dumps(snap, separators=(',',':')))
+        print(dumps(snap, compact=True))
     else:
-        print(json.dumps(snap, indent=2))
+        print(dumps(snap, indent=True))
 
 if __name__ == '__main__':
     main()
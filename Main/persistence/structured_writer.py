@@ -17,30 +17,203 @@ Inputs:
 
 Outputs / Side Effects:
     - Inserts/updates a single row in flight_searches (UPSERT on search_id).
-    - Deletes prior flight_results/segments/layovers/price_insights for search_id then reinserts.
+    - Deletes prior flight_results/segments/layovers/price_insights for search_id then reinserts
+      (segments/layovers cascade from the flight_results DELETE via a TEMP trigger); skipped
+      when the search_id has never been stored.
+    - Sweeps orphaned price_insights rows at most once per _ORPHAN_SWEEP_INTERVAL_S per writer.
     - Inserts any newly discovered airlines (INSERT OR IGNORE) and optionally airports if
       PROCESSING_CONFIG['auto_extract_airports'] is enabled.
     - Emits structured log events efs.store.structured.* and logger info lines with counts.
 
 Failure Handling:
     - Any exception bubbles as StructuredStorageError (wrapped) to allow caller to log metrics.
-    - Partial writes avoided by single transaction commit at end.
+    - Partial writes avoided by a single BEGIN IMMEDIATE transaction committed at end.
+    - Foreign keys are deferred for that transaction; violations surface at COMMIT.
 
 Idempotency Notes:
     - Old subordinate rows are purged prior to reinsertion ensuring deterministic set.
     - price_insights cleaned then re-added (unique index enforced externally).
+    - A payload (cache key + flights + insights) already stored by this writer under
+      another search_id is not rewritten; that search's flight_searches row is refreshed.
 """
 from __future__ import annotations
+from collections import OrderedDict
+from types import MappingProxyType
 from typing import Any
+import hashlib
 import json
 import logging
+import sqlite3
+import threading
+import time
 from datetime import datetime
+from functools import lru_cache
 
 from Main.config import PROCESSING_CONFIG
-from Main.core.db_utils import open_connection  # type: ignore
+from Main.core.db_utils import in_clause, open_connection  # type: ignore
+from Main.core.json_utils import dumps as _json_dumps  # type: ignore
 from Main.core.structured_logging import log_event, log_exception  # type: ignore
 from Main.constants import Event, emit
 
+# Connection-scoped (TEMP) stand-in for ON DELETE CASCADE on
+# flight_segments/layovers.flight_result_id: the persistent schema is left
+# untouched (no table rebuild / snapshot drift), yet one parent DELETE clears
+# the dependents. BEFORE so foreign_keys=ON never sees orphaned children.
+_CASCADE_RESULT_CHILDREN = """
+CREATE TEMP TRIGGER IF NOT EXISTS trg_flight_results_cascade
+BEFORE DELETE ON flight_results
+BEGIN
+    DELETE FROM layovers WHERE flight_result_id = OLD.id;
+    DELETE FROM flight_segments WHERE flight_result_id = OLD.id;
+END
+"""
+
+_UPSERT_SEARCH = """
+    INSERT INTO flight_searches (
+        search_id, search_timestamp, departure_airport_code, arrival_airport_code,
+        outbound_date, return_date, flight_type, adults, children,
+        infants_in_seat, infants_on_lap, travel_class, currency,
+        country_code, language_code, raw_parameters, response_status,
+        total_results, cache_key, api_query_id, created_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(search_id) DO UPDATE SET
+        search_timestamp=excluded.search_timestamp,
+        departure_airport_code=excluded.departure_airport_code,
+        arrival_airport_code=excluded.arrival_airport_code,
+        outbound_date=excluded.outbound_date,
+        return_date=excluded.return_date,
+        flight_type=excluded.flight_type,
+        adults=excluded.adults,
+        children=excluded.children,
+        infants_in_seat=excluded.infants_in_seat,
+        infants_on_lap=excluded.infants_on_lap,
+        travel_class=excluded.travel_class,
+        currency=excluded.currency,
+        country_code=excluded.country_code,
+        language_code=excluded.language_code,
+        raw_parameters=excluded.raw_parameters,
+        response_status=excluded.response_status,
+        total_results=excluded.total_results,
+        cache_key=excluded.cache_key,
+        api_query_id=excluded.api_query_id
+"""
+
+_INSERT_RESULTS_RETURNING = """
+    INSERT INTO flight_results (
+        search_id, result_type, result_rank, total_duration, total_price,
+        price_currency, flight_type, layover_count, carbon_emissions_flight,
+        carbon_emissions_typical, carbon_emissions_difference_percent,
+        departure_token, booking_token, airline_logo_url, created_at
+    ) VALUES {values}
+    RETURNING id, result_type, result_rank
+"""
+_RESULT_VALUES_ROW = '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+_RESULT_ROWS_PER_INSERT = 500  # 15 params/row; stays far below SQLite's host-parameter limit
+
+_INSERT_SEGMENTS = """
+    INSERT INTO flight_segments (
+        flight_result_id, segment_order, departure_airport_code, departure_time,
+        arrival_airport_code, arrival_time, duration_minutes, airplane_model,
+        airline_code, flight_number, travel_class, legroom,
+        often_delayed, extensions, created_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_INSERT_LAYOVERS = """
+    INSERT INTO layovers (
+        flight_result_id, layover_order, airport_code, duration_minutes, is_overnight, created_at
+    ) VALUES (?, ?, ?, ?, ?, ?)
+"""
+_INSERT_PRICE_INSIGHTS = """
+    INSERT INTO price_insights (search_id, lowest_price, price_level, typical_price_low, typical_price_high, price_history, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+_INSERT_AIRPORT = "INSERT OR IGNORE INTO airports(airport_code, airport_name) VALUES (?, ?)"
+_INSERT_AIRLINE = "INSERT OR IGNORE INTO airlines(airline_code, airline_name) VALUES (?, ?)"
+
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+_EMPTY = MappingProxyType({})  # shared read-only stand-in for absent nested objects
+_EMPTY_JSON_LIST = '[]'  # most segments carry no extensions
+_SEEN_AIRPORTS_MAX = 20000  # > every IATA code in airports.csv; reset rather than evict
+_ORPHAN_SWEEP_INTERVAL_S = 3600
+_RECENT_STORES_MAX = 256  # payload digest -> search_id entries kept per writer
+
+
+def _payload_digest(cache_key: str, api_response: dict[str, Any]) -> str:
+    """Digest of the search (cache key) and flight data a store call writes.
+
+    search_id and api_query_id are left out: every API call gets fresh ones, so
+    equal digests mean the rows would match apart from that bookkeeping.
+    """
+    payload = [
+        cache_key,
+        api_response.get('best_flights', []),
+        api_response.get('other_flights', []),
+        api_response.get('price_insights'),
+    ]
+    raw = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+@lru_cache(maxsize=4096)
+def _canon_str(code: str) -> str:
+    return code.strip().upper()
+
+
+def _canon(code: Any) -> str:
+    """Normalize an airport code ('' for empty); str inputs are memoized."""
+    if not code:
+        return ''
+    return _canon_str(code) if isinstance(code, str) else str(code).strip().upper()
+
+
+@lru_cache(maxsize=4096)
+def _canon_airline_str(code: str) -> str:
+    s = code.strip().upper()
+    return s if (2 <= len(s) <= 3 and s.isalnum()) else ''
+
+
+def _canon_airline(code: Any) -> str:
+    """Normalize a 2-3 char airline code ('' when not plausible); memoized like _canon."""
+    if not code:
+        return ''
+    return _canon_airline_str(code if isinstance(code, str) else str(code))
+
+
+def _iter_segment_rows(pending, id_map, seg_codes, known_airports, now_iso):  # noqa: ANN001
+    """Yield flight_segments rows for segments whose airports are both known."""
+    dumps = _json_dumps
+    for legacy, rank, segs, _lays in pending:
+        fid = id_map.get((legacy, rank))
+        if not fid:
+            continue
+        for order, seg in enumerate(segs, 1):
+            seg_get = seg.get
+            dep_seg = seg_get('departure_airport') or _EMPTY
+            arr_seg = seg_get('arrival_airport') or _EMPTY
+            dep_code_seg = _canon(dep_seg.get('id'))
+            arr_code_seg = _canon(arr_seg.get('id'))
+            if dep_code_seg not in known_airports or arr_code_seg not in known_airports:
+                continue
+            yield (
+                fid, order, dep_code_seg, dep_seg.get('time'), arr_code_seg, arr_seg.get('time'),
+                seg_get('duration'), seg_get('airplane'), seg_codes[id(seg)], seg_get('flight_number'),
+                seg_get('travel_class'), seg_get('legroom'), seg_get('often_delayed_by_over_30_min', False),
+                dumps(ext) if (ext := seg_get('extensions')) else _EMPTY_JSON_LIST, now_iso,
+            )
+
+
+def _iter_layover_rows(pending, id_map, known_airports, now_iso):  # noqa: ANN001
+    """Yield layovers rows for layovers at known airports."""
+    for legacy, rank, _segs, lays in pending:
+        fid = id_map.get((legacy, rank))
+        if not fid:
+            continue
+        for order, lay in enumerate(lays, 1):
+            lay_code = _canon(lay.get('id'))
+            if lay_code not in known_airports:
+                continue
+            yield (fid, order, lay_code, lay.get('duration'), lay.get('overnight', False), now_iso)
+
+
 class StructuredStorageError(Exception):
     pass
 
@@ -48,26 +221,139 @@ class StructuredFlightWriter:
     def __init__(self, db_path: str, logger: logging.Logger | None = None) -> None:
         self.db_path = db_path
         self.logger = logger or logging.getLogger(__name__)
+        # Airport codes confirmed present in a committed DB state. Airports are
+        # append-only reference data at runtime (nothing deletes them), so later
+        # stores skip the lookup for codes seen before. Bounded by _SEEN_AIRPORTS_MAX.
+        self._seen_airports: set[str] = set()
+        # Payload digest -> search_id whose rows hold that payload (LRU), plus
+        # the reverse map so a search_id rewritten with new data drops its old
+        # entry. Upstream search_ids embed a timestamp, so a retry, refresh or
+        # overlapping week run repeats the payload under a new id; that store
+        # only refreshes the existing flight_searches row instead of rewriting.
+        self._recent_stores: OrderedDict[str, str] = OrderedDict()
+        self._recent_digests: dict[str, str] = {}
+        self._recent_lock = threading.Lock()
+        self._last_orphan_sweep = float('-inf')
 
     # Public API
     def store(self, search_id: str, search_params: dict[str, Any], api_response: dict[str, Any], api_query_id: int | None) -> None:  # noqa: ANN401
         try:
-            self._store_impl(search_id, search_params, api_response, api_query_id)
+            from Main.cache import FlightSearchCache  # local to avoid circular
+            cache_key = FlightSearchCache(self.db_path).generate_cache_key(search_params)
+            digest = _payload_digest(cache_key, api_response)
+            stored_as = self._touch_unchanged(digest, api_query_id)
+            if stored_as is not None:
+                self.logger.debug("Structured storage skipped (unchanged payload) search_id=%s stored_as=%s", search_id, stored_as)
+                return
+            if self._store_impl(search_id, search_params, api_response, api_query_id, cache_key):
+                self._remember(search_id, digest)
         except Exception as e:  # pragma: no cover (defensive)
             log_exception(str(Event.STORE_STRUCTURED_ERROR), search_id=search_id, exc=e)
             raise
 
+    def _touch_unchanged(self, digest: str, api_query_id: int | None) -> str | None:
+        """Return the search_id already holding this payload, after refreshing its row.
+
+        The refresh keeps cache freshness (created_at) and raw lineage
+        (api_query_id) what a full rewrite would give. None means store normally,
+        including when the rows were removed since (cache cleanup).
+        """
+        with self._recent_lock:
+            stored_as = self._recent_stores.get(digest)
+            if stored_as is None:
+                return None
+            self._recent_stores.move_to_end(digest)
+        now_iso = datetime.now().isoformat()
+        with open_connection(self.db_path) as conn:
+            touched = conn.execute(
+                "UPDATE flight_searches SET search_timestamp = ?, api_query_id = ?, created_at = ? WHERE search_id = ?",
+                (now_iso, api_query_id, now_iso, stored_as),
+            ).rowcount
+        return stored_as if touched else None
+
+    def _remember(self, search_id: str, digest: str) -> None:
+        with self._recent_lock:
+            previous = self._recent_digests.pop(search_id, None)
+            if previous is not None:
+                self._recent_stores.pop(previous, None)  # those rows were just replaced
+            self._recent_stores[digest] = search_id
+            self._recent_stores.move_to_end(digest)
+            self._recent_digests[search_id] = digest
+            while len(self._recent_stores) > _RECENT_STORES_MAX:
+                _old_digest, old_sid = self._recent_stores.popitem(last=False)
+                self._recent_digests.pop(old_sid, None)
+
     # Internal implementation (adapted from original method)
-    def _store_impl(self, search_id: str, search_params: dict[str, Any], api_response: dict[str, Any], api_query_id: int | None):  # noqa: ANN401
+    def _store_impl(self, search_id: str, search_params: dict[str, Any], api_response: dict[str, Any], api_query_id: int | None, cache_key: str) -> bool:  # noqa: ANN401
+        """Write the normalized rows; returns False when storage was skipped."""
         auto_airports = bool(PROCESSING_CONFIG.get('auto_extract_airports', False))
-        from Main.cache import FlightSearchCache  # local to avoid circular
-        cache_key = FlightSearchCache(self.db_path).generate_cache_key(search_params)
         with open_connection(self.db_path) as conn:
+            # Take the write lock up front: avoids a read->write lock upgrade
+            # (SQLITE_BUSY under concurrent week searches) and keeps every
+            # statement below in one transaction / one commit.
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            # FK enforcement (open_connection enables it) is settled once at
+            # COMMIT, where a violation still raises IntegrityError and rolls
+            # back; statement order inside the bulk load stops mattering.
+            # Resets automatically when the transaction ends.
+            conn.execute("PRAGMA defer_foreign_keys=ON")
             cur = conn.cursor()
-            def _canon(code: Any) -> str:
-                return str(code).strip().upper() if code else ''
+            def _derive_airline(seg: dict[str, Any]) -> str:
+                fn = seg.get('flight_number')
+                if not fn:
+                    return ''
+                head = str(fn).strip().split(' ')[0].upper()
+                head = ''.join(ch for ch in head if ch.isalnum())
+                return head[:2] if len(head) >= 2 else ''
+            def _segment_airline(seg: dict[str, Any]) -> str:
+                al_code = _canon_airline(_derive_airline(seg)) or _canon_airline(seg.get('airline_code'))
+                if not al_code:
+                    name_raw = (seg.get('airline') or '').upper()
+                    derived = ''.join(ch for ch in name_raw if ch.isalnum())[:3]
+                    al_code = _canon_airline(derived) if len(derived) >= 2 else 'ZZ'
+                return al_code
+            # One timestamp for every row written by this store call
+            now_iso = datetime.now().isoformat()
+            is_round_trip = bool(search_params.get('return_date'))
+            # Single walk over the payload: collects every airport (resolved below with
+            # one IN lookup) and airline, builds the flight_results rows and queues each
+            # flight's segments/layovers for the pass after INSERT ... RETURNING.
+            wanted = {_canon(search_params.get('departure_id')), _canon(search_params.get('arrival_id'))}
+            airlines: dict[str, str] = {}
+            seg_airlines: dict[str, str] = {}
+            seg_codes: dict[int, str] = {}  # id(segment) -> airline_code reused by the segment pass
+            flight_rows: list[tuple] = []
+            add_flight = flight_rows.append
+            pending: list[tuple[str, int, list, list]] = []  # (result_type, rank, segments, layovers)
+            for group, legacy in ((api_response.get('best_flights', []), 'best_flight'), (api_response.get('other_flights', []), 'other_flight')):
+                for rank, flight in enumerate(group, 1):
+                    segs = flight.get('flights', [])
+                    lays = flight.get('layovers', [])
+                    carbon = flight.get('carbon_emissions') or _EMPTY
+                    flight_type_text = flight.get('type') or ('Round trip' if is_round_trip else 'One way')
+                    add_flight((search_id, legacy, rank, flight.get('total_duration'), flight.get('price'), 'USD', flight_type_text, len(lays), carbon.get('this_flight'), carbon.get('typical_for_this_route'), carbon.get('difference_percent'), flight.get('departure_token'), flight.get('booking_token'), flight.get('airline_logo'), now_iso))
+                    pending.append((legacy, rank, segs, lays))
+                    for seg in segs:
+                        wanted.add(_canon((seg.get('departure_airport') or _EMPTY).get('id')))
+                        wanted.add(_canon((seg.get('arrival_airport') or _EMPTY).get('id')))
+                        code = _canon_airline(_derive_airline(seg)) or _canon_airline(seg.get('airline_code')) or _canon_airline(seg.get('airline'))
+                        name = (seg.get('airline') or code or '').strip()
+                        if code:
+                            airlines[code] = name
+                        al_code = seg_codes[id(seg)] = _segment_airline(seg)
+                        seg_airlines.setdefault(al_code, seg.get('airline') or al_code)
+                    for lay in lays:
+                        wanted.add(_canon(lay.get('id')))
+            wanted.discard('')
+            known_airports: set[str] = wanted & self._seen_airports
+            unresolved = wanted - known_airports
+            if unresolved:
+                placeholders, codes = in_clause(sorted(unresolved))
+                cur.execute(f"SELECT airport_code FROM airports WHERE airport_code IN ({placeholders})", codes)
+                known_airports.update(r[0] for r in cur.fetchall())
             def _airport_exists(code: Any) -> bool:
-                c = _canon(code); cur.execute("SELECT 1 FROM airports WHERE airport_code = ? LIMIT 1", (c,)); return cur.fetchone() is not None
+                return _canon(code) in known_airports
             def _ensure_airport(code: Any) -> bool:
                 c = _canon(code)
                 if not c:
@@ -77,7 +363,8 @@ class StructuredFlightWriter:
                 if not auto_airports:
                     return False
                 try:
-                    cur.execute("INSERT OR IGNORE INTO airports(airport_code, airport_name) VALUES (?, ?)", (c, c))
+                    cur.execute(_INSERT_AIRPORT, (c, c))
+                    known_airports.add(c)
                     return True
                 except Exception:
                     return False
@@ -85,70 +372,48 @@ class StructuredFlightWriter:
             arr_code = _canon(search_params.get('arrival_id'))
             if not (_ensure_airport(dep_code) and _ensure_airport(arr_code)):
                 self.logger.warning("Skipping structured storage: missing airports dep=%s arr=%s", dep_code, arr_code)
-                return
-            # Airline collection
-            def _canon_airline(code: Any) -> str:
-                s = str(code).strip().upper() if code else ''
-                return s if (2 <= len(s) <= 3 and s.isalnum()) else ''
-            def _derive_airline(seg: dict[str, Any]) -> str:
-                fn = seg.get('flight_number')
-                if not fn:
-                    return ''
-                head = str(fn).strip().split(' ')[0].upper()
-                head = ''.join(ch for ch in head if ch.isalnum())
-                return head[:2] if len(head) >= 2 else ''
-            airlines: dict[str, str] = {}
-            for group in (api_response.get('best_flights', []), api_response.get('other_flights', [])):
-                for flight in group:
-                    for seg in flight.get('flights', []):
-                        code = _canon_airline(_derive_airline(seg)) or _canon_airline(seg.get('airline_code')) or _canon_airline(seg.get('airline'))
-                        name = (seg.get('airline') or code or '').strip()
-                        if code:
-                            airlines[code] = name
-            for code, name in airlines.items():
-                cur.execute("INSERT OR IGNORE INTO airlines(airline_code, airline_name) VALUES (?, ?)", (code, name or code))
-            # Idempotent cleanup for this search
-            try:
-                cur.execute("DELETE FROM price_insights WHERE search_id NOT IN (SELECT search_id FROM flight_searches)")
-            except Exception:
-                pass
-            cur.execute("DELETE FROM layovers WHERE flight_result_id IN (SELECT id FROM flight_results WHERE search_id = ?)", (search_id,))
-            cur.execute("DELETE FROM flight_segments WHERE flight_result_id IN (SELECT id FROM flight_results WHERE search_id = ?)", (search_id,))
-            cur.execute("DELETE FROM flight_results WHERE search_id = ?", (search_id,))
-            cur.execute("DELETE FROM price_insights WHERE search_id = ?", (search_id,))
+                return False
+            if auto_airports:
+                # Register every other referenced code up front (one executemany) so
+                # the row generators below only test set membership.
+                missing = sorted(wanted - known_airports)
+                if missing:
+                    cur.executemany(_INSERT_AIRPORT, [(c, c) for c in missing])
+                    known_airports.update(missing)
+            for code, name in seg_airlines.items():
+                airlines.setdefault(code, name)
+            # Prewarm airline existence the same way; only unseen codes are inserted (one executemany)
+            known_airlines: set[str] = set()
+            if airlines:
+                placeholders, codes = in_clause(sorted(airlines))
+                cur.execute(f"SELECT airline_code FROM airlines WHERE airline_code IN ({placeholders})", codes)
+                known_airlines.update(r[0] for r in cur.fetchall())
+            new_airlines = [(code, name or code) for code, name in airlines.items() if code not in known_airlines]
+            if new_airlines:
+                cur.executemany(_INSERT_AIRLINE, new_airlines)
+                known_airlines.update(code for code, _ in new_airlines)
+            # Table-wide orphan price_insights sweep: at most once per interval per
+            # writer, and never for an empty response (no flights, no insights),
+            # which writes only the flight_searches row.
+            if (flight_rows or 'price_insights' in api_response) and time.monotonic() - self._last_orphan_sweep >= _ORPHAN_SWEEP_INTERVAL_S:
+                try:
+                    cur.execute("DELETE FROM price_insights WHERE search_id NOT IN (SELECT search_id FROM flight_searches)")
+                    self._last_orphan_sweep = time.monotonic()
+                except Exception:
+                    pass
+            # Idempotent cleanup for this search; a first store of a search_id has
+            # nothing to replace (children are FK-bound to the flight_searches row).
+            cur.execute("SELECT 1 FROM flight_searches WHERE search_id = ?", (search_id,))
+            if cur.fetchone() is not None:
+                # Children go with their flight_results row via the cascade trigger
+                cur.execute(_CASCADE_RESULT_CHILDREN)
+                cur.execute("DELETE FROM flight_results WHERE search_id = ?", (search_id,))
+                cur.execute("DELETE FROM price_insights WHERE search_id = ?", (search_id,))
             cur.execute(
-                """
-                INSERT INTO flight_searches (
-                    search_id, search_timestamp, departure_airport_code, arrival_airport_code,
-                    outbound_date, return_date, flight_type, adults, children,
-                    infants_in_seat, infants_on_lap, travel_class, currency,
-                    country_code, language_code, raw_parameters, response_status,
-                    total_results, cache_key, api_query_id, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(search_id) DO UPDATE SET
-                    search_timestamp=excluded.search_timestamp,
-                    departure_airport_code=excluded.departure_airport_code,
-                    arrival_airport_code=excluded.arrival_airport_code,
-                    outbound_date=excluded.outbound_date,
-                    return_date=excluded.return_date,
-                    flight_type=excluded.flight_type,
-                    adults=excluded.adults,
-                    children=excluded.children,
-                    infants_in_seat=excluded.infants_in_seat,
-                    infants_on_lap=excluded.infants_on_lap,
-                    travel_class=excluded.travel_class,
-                    currency=excluded.currency,
-                    country_code=excluded.country_code,
-                    language_code=excluded.language_code,
-                    raw_parameters=excluded.raw_parameters,
-                    response_status=excluded.response_status,
-                    total_results=excluded.total_results,
-                    cache_key=excluded.cache_key,
-                    api_query_id=excluded.api_query_id
-                """,
+                _UPSERT_SEARCH,
                 (
                     search_id,
-                    datetime.now().isoformat(),
+                    now_iso,
                     dep_code,
                     arr_code,
                     search_params.get('outbound_date'),
@@ -167,103 +432,63 @@ class StructuredFlightWriter:
                     len(api_response.get('best_flights', [])) + len(api_response.get('other_flights', [])),
                     cache_key,
                     api_query_id,
-                    datetime.now().isoformat()
+                    now_iso
                 )
             )
-            flight_rows = []
-            now_iso = datetime.now().isoformat()
-            is_round_trip = bool(search_params.get('return_date'))
-            for group, label in ((api_response.get('best_flights', []), 'best'), (api_response.get('other_flights', []), 'other')):
-                for rank, flight in enumerate(group, 1):
-                    legacy = 'best_flight' if label == 'best' else 'other_flight'
-                    flight_type_text = flight.get('type') or ('Round trip' if is_round_trip else 'One way')
-                    flight_rows.append((search_id, legacy, rank, flight.get('total_duration'), flight.get('price'), 'USD', flight_type_text, len(flight.get('layovers', [])), flight.get('carbon_emissions', {}).get('this_flight'), flight.get('carbon_emissions', {}).get('typical_for_this_route'), flight.get('carbon_emissions', {}).get('difference_percent'), flight.get('departure_token'), flight.get('booking_token'), flight.get('airline_logo'), now_iso))
+            seg_count = 0
             if flight_rows:
-                cur.executemany("""
-                    INSERT INTO flight_results (
-                        search_id, result_type, result_rank, total_duration, total_price,
-                        price_currency, flight_type, layover_count, carbon_emissions_flight,
-                        carbon_emissions_typical, carbon_emissions_difference_percent,
-                        departure_token, booking_token, airline_logo_url, created_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, flight_rows)
-                cur.execute("SELECT id, result_type, result_rank FROM flight_results WHERE search_id = ?", (search_id,))
-                id_map = {(r[1], r[2]): r[0] for r in cur.fetchall()}
-                segment_rows = []
-                layover_rows = []
-                for group, label in ((api_response.get('best_flights', []), 'best'), (api_response.get('other_flights', []), 'other')):
-                    for rank, flight in enumerate(group, 1):
-                        fid = id_map.get(('best_flight' if label == 'best' else 'other_flight', rank))
-                        if not fid:
-                            continue
-                        for order, seg in enumerate(flight.get('flights', []), 1):
-                            dep_seg = seg.get('departure_airport', {})
-                            arr_seg = seg.get('arrival_airport', {})
-                            dep_code_seg = _canon(dep_seg.get('id'))
-                            arr_code_seg = _canon(arr_seg.get('id'))
-                            if not (_ensure_airport(dep_code_seg) and _ensure_airport(arr_code_seg)):
-                                continue
-                            al_code = _canon_airline(_derive_airline(seg)) or _canon_airline(seg.get('airline_code'))
-                            if not al_code:
-                                name_raw = (seg.get('airline') or '').upper()
-                                derived = ''.join(ch for ch in name_raw if ch.isalnum())[:3]
-                                if len(derived) >= 2:
-                                    al_code = _canon_airline(derived)
-                                else:
-                                    al_code = 'ZZ'
-                            try:
-                                cur.execute("INSERT OR IGNORE INTO airlines(airline_code, airline_name) VALUES (?, ?)", (al_code, (seg.get('airline') or al_code)))
-                            except Exception:
-                                pass
-                            segment_rows.append((fid, order, dep_code_seg, dep_seg.get('time'), arr_code_seg, arr_seg.get('time'), seg.get('duration'), seg.get('airplane'), al_code, seg.get('flight_number'), seg.get('travel_class'), seg.get('legroom'), seg.get('often_delayed_by_over_30_min', False), json.dumps(seg.get('extensions', [])), now_iso))
-                        for order, lay in enumerate(flight.get('layovers', []), 1):
-                            lay_code = _canon(lay.get('id'))
-                            if not _ensure_airport(lay_code):
-                                continue
-                            layover_rows.append((fid, order, lay_code, lay.get('duration'), lay.get('overnight', False), now_iso))
-                if segment_rows:
-                    cur.executemany("""
-                        INSERT INTO flight_segments (
-                            flight_result_id, segment_order, departure_airport_code, departure_time,
-                            arrival_airport_code, arrival_time, duration_minutes, airplane_model,
-                            airline_code, flight_number, travel_class, legroom,
-                            often_delayed, extensions, created_at
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, segment_rows)
-                if layover_rows:
-                    cur.executemany("""
-                        INSERT INTO layovers (
-                            flight_result_id, layover_order, airport_code, duration_minutes, is_overnight, created_at
-                        ) VALUES (?, ?, ?, ?, ?, ?)
-                    """, layover_rows)
+                # Multi-row INSERT ... RETURNING hands back the new ids directly (no re-read
+                # of flight_results). RETURNING order is unspecified, so key by (type, rank).
+                id_map: dict[tuple[str, int], int] = {}
+                if _HAS_RETURNING:
+                    for start in range(0, len(flight_rows), _RESULT_ROWS_PER_INSERT):
+                        chunk = flight_rows[start:start + _RESULT_ROWS_PER_INSERT]
+                        cur.execute(
+                            _INSERT_RESULTS_RETURNING.format(values=','.join([_RESULT_VALUES_ROW] * len(chunk))),
+                            [v for row in chunk for v in row],
+                        )
+                        id_map.update({(r[1], r[2]): r[0] for r in cur.fetchall()})
+                else:  # pragma: no cover - SQLite < 3.35
+                    cur.executemany(_INSERT_RESULTS_RETURNING.format(values=_RESULT_VALUES_ROW).replace('RETURNING id, result_type, result_rank', ''), flight_rows)
+                    cur.execute("SELECT id, result_type, result_rank FROM flight_results WHERE search_id = ?", (search_id,))
+                    id_map = {(r[1], r[2]): r[0] for r in cur.fetchall()}
+                # Rows are streamed into executemany (no materialized lists)
+                cur.executemany(_INSERT_SEGMENTS, _iter_segment_rows(pending, id_map, seg_codes, known_airports, now_iso))
+                seg_count = max(cur.rowcount, 0)
+                cur.executemany(_INSERT_LAYOVERS, _iter_layover_rows(pending, id_map, known_airports, now_iso))
             if 'price_insights' in api_response:
-                self._insert_price_insights(cur, search_id, api_response['price_insights'])
+                self._insert_price_insights(cur, search_id, api_response['price_insights'], now_iso)
             conn.commit()
+            # Only now (committed) may auto-inserted airports be trusted by later stores
+            if len(self._seen_airports) > _SEEN_AIRPORTS_MAX:
+                self._seen_airports.clear()
+            self._seen_airports.update(known_airports)
             emit(Event.STORE_STRUCTURED_SUCCESS, log_event, search_id=search_id)
-            try:
-                cur2 = conn.cursor()
-                cur2.execute("SELECT COUNT(*) FROM flight_results WHERE search_id=?", (search_id,))
-                fr_count = cur2.fetchone()[0]
-                cur2.execute("SELECT COUNT(*) FROM flight_segments fs JOIN flight_results fr ON fs.flight_result_id=fr.id WHERE fr.search_id=?", (search_id,))
-                seg_count = cur2.fetchone()[0]
-                self.logger.info("Structured storage committed search_id=%s results=%s segments=%s cache_key=%s", search_id, fr_count, seg_count, cache_key[:12])
-            except Exception:  # pragma: no cover
-                pass
-
-    def _insert_price_insights(self, cur, search_id: str, pi: dict[str, Any]):  # noqa: ANN001
+            # Counts are known from the build phase; re-reading them is a DEBUG-only check
+            fr_count = len(flight_rows)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                try:
+                    cur2 = conn.cursor()
+                    cur2.execute("SELECT COUNT(*) FROM flight_results WHERE search_id=?", (search_id,))
+                    fr_count = cur2.fetchone()[0]
+                    cur2.execute("SELECT COUNT(*) FROM flight_segments fs JOIN flight_results fr ON fs.flight_result_id=fr.id WHERE fr.search_id=?", (search_id,))
+                    seg_count = cur2.fetchone()[0]
+                except Exception:  # pragma: no cover
+                    pass
+            self.logger.info("Structured storage committed search_id=%s results=%s segments=%s cache_key=%s", search_id, fr_count, seg_count, cache_key[:12])
+        return True
+
+    def _insert_price_insights(self, cur, search_id: str, pi: dict[str, Any], now_iso: str | None = None):  # noqa: ANN001
         cur.execute(
-            """
-            INSERT INTO price_insights (search_id, lowest_price, price_level, typical_price_low, typical_price_high, price_history, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
+            _INSERT_PRICE_INSIGHTS,
             (
                 search_id,
                 pi.get('lowest_price'),
                 pi.get('price_level'),
                 pi.get('typical_price_range', [None, None])[0],
                 pi.get('typical_price_range', [None, None])[1],
-                json.dumps(pi.get('price_history', [])),
-                datetime.now().isoformat()
+                _json_dumps(history) if (history := pi.get('price_history')) else _EMPTY_JSON_LIST,
+                now_iso or datetime.now().isoformat()
             )
         )
 
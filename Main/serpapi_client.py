@@ -14,6 +14,7 @@ from typing import Any
 from urllib.parse import urlencode
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from Main.config import DEFAULT_SEARCH_PARAMS, RATE_LIMIT_CONFIG, SERPAPI_CONFIG, get_api_key
 from Main.core.common_validation import FlightSearchValidator, RateLimiter  # type: ignore
@@ -23,11 +24,24 @@ from Main.core.structured_logging import log_event, log_exception  # type: ignor
 
 init_logging()
 
+def build_session() -> requests.Session:
+    """Session with a sized keep-alive pool (retries are handled in _make_request)."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=SERPAPI_CONFIG.get('pool_connections', 8),
+                          pool_maxsize=SERPAPI_CONFIG.get('pool_maxsize', 32),
+                          max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
 class SerpAPIFlightClient:
     """SerpAPI Google Flights API Client"""
     
-    def __init__(self, api_key: str | None = None):
-        """Initialize the client (API key must come from environment variable)."""
+    def __init__(self, api_key: str | None = None, session: requests.Session | None = None):
+        """Initialize the client (API key must come from environment variable).
+
+        An existing session may be passed to share its keep-alive pool.
+        """
         self.api_key = api_key or get_api_key()
         if not self.api_key:
             # Security: do NOT suggest plaintext file storage per agent instructions
@@ -40,7 +54,7 @@ class SerpAPIFlightClient:
         self.retry_delay = SERPAPI_CONFIG['retry_delay']
         
         self.rate_limiter = RateLimiter() if RATE_LIMIT_CONFIG['enable_rate_limiting'] else None
-        self.session = requests.Session()
+        self.session = session or build_session()
         
         # Setup logging
         self.logger = logging.getLogger(__name__)
@@ -98,18 +112,14 @@ class SerpAPIFlightClient:
             route=f"{params.get('departure_id')}-{params.get('arrival_id')}"
         )
         
-        # Check rate limits
-        if self.rate_limiter and not self.rate_limiter.can_make_request():
+        # Check rate limits (reserves the slot atomically before the call)
+        if self.rate_limiter and not self.rate_limiter.try_acquire():
             raise Exception("Rate limit exceeded. Please wait before making another request.")
 
         try:
             # Make API request
             response_data = self._make_request(params, search_id=search_id)
             
-            # Record request if rate limiting is enabled
-            if self.rate_limiter:
-                self.rate_limiter.record_request()
-            
             # Process response
             result = {
                 'success': True,
@@ -124,7 +134,7 @@ class SerpAPIFlightClient:
             
         except Exception as e:
             # Handle API errors
-            self.logger.error(f"Flight search failed: {str(e)}")
+            self.logger.error("Flight search failed: %s", e)
             log_exception('search.error', search_id=search_id, exc=e)
             result = {
                 'success': False,
@@ -153,7 +163,7 @@ class SerpAPIFlightClient:
                 # Mask API key in logs
                 safe_url = url.replace(self.api_key, '***') if self.api_key else url
                 prefix = f"[{search_id}] " if search_id else ""
-                self.logger.info(f"{prefix}API request attempt {attempt + 1} -> {safe_url}")
+                self.logger.info("%sAPI request attempt %d -> %s", prefix, attempt + 1, safe_url)
                 log_event('api.attempt', search_id=search_id, attempt=attempt+1)
                 attempt_start = perf_counter()
                 response = self.session.get(url, timeout=self.timeout)
@@ -184,7 +194,7 @@ class SerpAPIFlightClient:
                 
             except requests.exceptions.RequestException as e:
                 prefix = f"[{search_id}] " if search_id else ""
-                self.logger.warning(f"{prefix}Request attempt {attempt + 1} failed: {e}")
+                self.logger.warning("%sRequest attempt %d failed: %s", prefix, attempt + 1, e)
                 if attempt > 0:
                     METRICS.inc('retry_attempts')
                 log_event('api.retry', search_id=search_id, attempt=attempt+1, error=str(e))
@@ -194,14 +204,14 @@ class SerpAPIFlightClient:
                     jitter = random.uniform(0, 0.4)
                     time.sleep(base_delay + jitter)  # Exponential backoff + constant jitter component
                 else:
-                    self.logger.error(f"{prefix}All {self.max_retries + 1} attempts failed")
+                    self.logger.error("%sAll %d attempts failed", prefix, self.max_retries + 1)
                     METRICS.inc('api_failures')
                     log_exception('api.failed', search_id=search_id, exc=e, attempts=self.max_retries+1)
                     raise Exception(f"API request failed after {self.max_retries + 1} attempts: {e}") from e
             
             except Exception as e:
                 prefix = f"[{search_id}] " if search_id else ""
-                self.logger.error(f"{prefix}Unexpected error: {e}")
+                self.logger.error("%sUnexpected error: %s", prefix, e)
                 METRICS.inc('api_failures')
                 log_exception('api.exception', search_id=search_id, exc=e)
                 raise
@@ -6,7 +6,8 @@ Role:
     collection, simple price trend metrics, and a summary block.
 
 Inputs:
-    client: object providing search_flights(...)
+    client: object providing search_flights(...) and optionally
+        search_cache_many(...) for a batched cache prefilter
     departure_id / arrival_id: IATA codes
     start_date: str (YYYY-MM-DD) defining day0 of the week window
     **kwargs: forwarded to client.search_flights (passenger counts, filters)
@@ -17,29 +18,50 @@ Outputs:
         date_range: 'YYYY-MM-DD to YYYY-MM-DD'
         daily_results: { date: { result, day_name, day_offset, ... } }
         best_week_flights: top 10 cheapest flights (heuristic price parse)
-        all_week_flights: full flattened list (each augmented with search_date,...)
+        all_week_flights: full flattened list (copies augmented with search_date,...)
         price_trend: {'daily_min_prices','daily_avg_prices','weekday_analysis','trend_analysis'}
         summary: derived aggregate metrics and cheapest/most_expensive day info
 
 Side Effects:
     - Emits structured log events efs.week.* for observability.
-    - Calls client's search_flights which may access cache / API.
+    - Resolves cached days with one batched cache probe (when the client
+      supports it) and fans the remaining days out to client.search_flights
+      concurrently on a bounded thread pool (API rate limiting still applies
+      per call inside the client).
 
 Failure Handling:
     - Individual day failures are recorded with an 'error' key; others proceed.
     - Entire operation returns success=False only if 0/7 days succeed.
 """
 from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Any
 import logging
+import re
 
 from Main.core.structured_logging import log_event  # type: ignore
 from Main.constants import Event, emit
 
+_PRICE_RE = re.compile(r'\d+(?:\.\d+)?')
+
+def _parse_price(raw: Any) -> float:
+    """Parse a SerpAPI price (int or '1,234 USD' style string) once; 0.0 when absent/malformed."""
+    if isinstance(raw, int | float):
+        return float(raw)
+    if not raw:
+        return 0.0
+    m = _PRICE_RE.search(str(raw).replace(',', ''))  # replace returns s itself when comma-free
+    return float(m.group()) if m else 0.0
+
+def _rank_key(item: tuple[float, dict[str, Any]]) -> float:
+    # Unpriced flights sink to the end of the ranking
+    return item[0] or 9999.0
+
 class WeekRangeAggregator:
-    def __init__(self, logger: logging.Logger | None = None) -> None:
+    def __init__(self, logger: logging.Logger | None = None, max_workers: int = 7) -> None:
         self.logger = logger or logging.getLogger(__name__)
+        self.max_workers = max(1, max_workers)
 
     def run_week(self, client, departure_id: str, arrival_id: str, start_date: str, **kwargs) -> dict[str, Any]:  # noqa: ANN401
         try:
@@ -56,15 +78,20 @@ class WeekRangeAggregator:
         emit(Event.WEEK_START, log_event, route=f"{departure_id}-{arrival_id}", start_date=start_date)
 
         daily_results: dict[str, Any] = {}
-        all_flights: list[dict[str, Any]] = []
+        day_prices: dict[str, list[float]] = {}
+        ranked: list[tuple[float, dict[str, Any]]] = []  # (parsed price, tagged flight)
         successful_searches = 0
         total_flights_found = 0
 
-        for day_offset in range(7):
-            search_date = (start_dt + timedelta(days=day_offset)).strftime('%Y-%m-%d')
-            day_name = (start_dt + timedelta(days=day_offset)).strftime('%A')
+        week_days = [start_dt + timedelta(days=day_offset) for day_offset in range(7)]
+        search_dates = [d.strftime('%Y-%m-%d') for d in week_days]
+        day_names = [d.strftime('%A') for d in week_days]
+        for day_offset, search_date in enumerate(search_dates):
             emit(Event.WEEK_DAY_START, log_event, date=search_date, day_offset=day_offset)
-            daily_result = client.search_flights(departure_id, arrival_id, search_date, **kwargs)
+        day_results = self._fetch_days(client, departure_id, arrival_id, search_dates, kwargs)
+
+        for day_offset, (search_date, day_name) in enumerate(zip(search_dates, day_names, strict=True)):
+            daily_result = day_results[search_date]
             if daily_result.get('success'):
                 successful_searches += 1
                 daily_results[search_date] = {
@@ -77,13 +104,21 @@ class WeekRangeAggregator:
                 other_flights = data.get('other_flights', [])
                 # Filter out synthetic inbound fallback flights (tagged by inbound_merge)
                 other_flights = [f for f in other_flights if not f.get('__inbound_fallback__')]
+                prices = day_prices[search_date] = []
+                best_ids = {id(f) for f in best_flights}
                 for flight in best_flights + other_flights:
-                    f2 = flight.copy()
-                    f2['search_date'] = search_date
-                    f2['day_name'] = day_name
-                    f2['day_offset'] = day_offset
-                    f2['is_best'] = flight in best_flights
-                    all_flights.append(f2)
+                    is_best = id(flight) in best_ids
+                    # Tag a shallow copy: the client's dicts may still be read elsewhere
+                    # (e.g. queued for async persistence on the writer thread).
+                    flight = flight.copy()
+                    flight['search_date'] = search_date
+                    flight['day_name'] = day_name
+                    flight['day_offset'] = day_offset
+                    flight['is_best'] = is_best
+                    price = _parse_price(flight.get('price'))
+                    if price > 0:
+                        prices.append(price)
+                    ranked.append((price, flight))
                 daily_count = len(best_flights) + len(other_flights)
                 total_flights_found += daily_count
                 emit(Event.WEEK_DAY_SUCCESS, log_event, date=search_date, flights=daily_count)
@@ -96,16 +131,11 @@ class WeekRangeAggregator:
                 }
                 emit(Event.WEEK_DAY_ERROR, log_event, date=search_date, error=daily_result.get('error'))
 
-        # Sort by price heuristic
-        def _price(f: dict[str, Any]):
-            s = f.get('price', '9999 USD')
-            try:
-                return float(s.replace(' USD', '').replace(',', ''))
-            except Exception:  # pragma: no cover - fallback for malformed price
-                return 9999.0
-        all_flights.sort(key=_price)
+        # Sort by the price parsed once during tagging (kept out of the flight dicts)
+        ranked.sort(key=_rank_key)
+        all_flights = [flight for _, flight in ranked]
 
-        price_trend = self._analyze_price_trend(daily_results)
+        price_trend = self._analyze_price_trend(daily_results, day_prices)
         summary = self._build_summary(start_date, end_date, price_trend, successful_searches, total_flights_found)
         result = {
             'success': successful_searches > 0,
@@ -124,24 +154,46 @@ class WeekRangeAggregator:
         emit(Event.WEEK_COMPLETE, log_event, successful_days=successful_searches, total_flights=total_flights_found)
         return result
 
-    def _analyze_price_trend(self, daily_results: dict) -> dict[str, Any]:  # noqa: ANN001
+    def _fetch_days(self, client, departure_id: str, arrival_id: str, search_dates: list[str], kwargs: dict[str, Any]) -> dict[str, dict[str, Any]]:  # noqa: ANN001
+        """Resolve every day: one batched cache probe, then a concurrent fan-out for the misses."""
+        prefetch = getattr(client, 'search_cache_many', None)
+        results: dict[str, dict[str, Any]] = dict(prefetch(departure_id, arrival_id, search_dates, **kwargs)) if prefetch else {}
+        misses = [d for d in search_dates if d not in results]
+        if not misses:
+            return results
+        # Misses were already probed above; skip the redundant per-day cache lookup
+        miss_kwargs = {**kwargs, 'force_api': True} if prefetch else kwargs
+        workers = min(self.max_workers, len(misses))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='efs-week') as pool:
+            futures = {d: pool.submit(client.search_flights, departure_id, arrival_id, d, **miss_kwargs) for d in misses}
+            for d, fut in futures.items():
+                results[d] = fut.result()
+        return results
+
+    def _analyze_price_trend(self, daily_results: dict, day_prices: dict[str, list[float]] | None = None) -> dict[str, Any]:  # noqa: ANN001
+        """Derive per-day min/avg prices; day_prices (pre-parsed, > 0) skips re-parsing the raw results."""
         daily_min_prices = {}
         daily_avg_prices = {}
         weekday_analysis = {'weekday': [], 'weekend': []}
+        trend = {'overall_price_trend': 'stable'}
+        analysis = {
+            'daily_min_prices': daily_min_prices,
+            'daily_avg_prices': daily_avg_prices,
+            'weekday_analysis': weekday_analysis,
+            'trend_analysis': trend
+        }
+        if all('error' in day_data for day_data in daily_results.values()):
+            return analysis  # nothing succeeded (or no days): skip the per-day pass
         for date_str, day_data in daily_results.items():
             if 'error' in day_data:
                 continue
             day_name = day_data['day_name']
-            data = day_data['result'].get('data', {})
-            flights = data.get('best_flights', []) + data.get('other_flights', [])
-            prices = []
-            for f in flights:
-                try:
-                    p = float(f.get('price', '0').replace(' USD', '').replace(',', ''))
-                    if p > 0:
-                        prices.append(p)
-                except Exception:
-                    continue
+            if day_prices is not None and date_str in day_prices:
+                prices = day_prices[date_str]
+            else:
+                data = day_data['result'].get('data', {})
+                flights = data.get('best_flights', []) + data.get('other_flights', [])
+                prices = [p for p in map(_parse_price, (f.get('price') for f in flights)) if p > 0]
             if prices:
                 daily_min_prices[date_str] = min(prices)
                 daily_avg_prices[date_str] = sum(prices) / len(prices)
@@ -149,20 +201,14 @@ class WeekRangeAggregator:
                     weekday_analysis['weekend'].append(date_str)
                 else:
                     weekday_analysis['weekday'].append(date_str)
-        trend = {'overall_price_trend': 'stable'}
         if len(daily_min_prices) > 1:
-            sorted_days = sorted(daily_min_prices.keys())
-            first_day, last_day = sorted_days[0], sorted_days[-1]
+            # ISO dates order lexically; min/max avoids sorting the whole key set
+            first_day, last_day = min(daily_min_prices), max(daily_min_prices)
             if daily_min_prices[last_day] < daily_min_prices[first_day]:
                 trend['overall_price_trend'] = 'decreasing'
             elif daily_min_prices[last_day] > daily_min_prices[first_day]:
                 trend['overall_price_trend'] = 'increasing'
-        return {
-            'daily_min_prices': daily_min_prices,
-            'daily_avg_prices': daily_avg_prices,
-            'weekday_analysis': weekday_analysis,
-            'trend_analysis': trend
-        }
+        return analysis
 
     def _build_summary(self, start_date: str, end_date: str, price_trend: dict[str, Any], success_days: int, total_flights: int) -> dict[str, Any]:
         summary = {
@@ -176,9 +222,14 @@ class WeekRangeAggregator:
             'most_expensive_day': None
         }
         if price_trend['daily_min_prices']:
-            mins = price_trend['daily_min_prices']
-            cheapest = min(mins.items(), key=lambda x: x[1])
-            expensive = max(mins.items(), key=lambda x: x[1])
+            # Single pass for both extremes (strict compares keep the earliest day on ties)
+            cheapest = (None, float('inf'))
+            expensive = (None, float('-inf'))
+            for day, price in price_trend['daily_min_prices'].items():
+                if price < cheapest[1]:
+                    cheapest = (day, price)
+                if price > expensive[1]:
+                    expensive = (day, price)
             summary['cheapest_day'] = {'date': cheapest[0], 'price': cheapest[1]}
             summary['most_expensive_day'] = {'date': expensive[0], 'price': expensive[1]}
         return summary
@@ -27,6 +27,13 @@ def test_cache_key_stability():
     assert k1 == k2, 'Cache key should be deterministic independent of param order'
 
 
+def test_cache_key_distinguishes_hash_equal_values():
+    cache = FlightSearchCache(db_path='DB/Main_DB.db')
+    base = {'departure_id': 'LAX', 'arrival_id': 'JFK', 'outbound_date': '2025-09-15'}
+    keys = [cache.generate_cache_key({**base, 'adults': v}) for v in (1, True, 1.0)]
+    assert len(set(keys)) == 3  # 1 == True == 1.0 must not share a key (order-independent)
+
+
 def test_result_type_normalization():
     # Simple invariants replicating internal mapping logic (no DB dependency)
     def normalize(label: str) -> str:
@@ -34,3 +41,20 @@ def test_result_type_normalization():
     assert normalize('best_flight') == 'best'
     assert normalize('best') == 'best'
     assert normalize('other_flight') == 'other'
+
+
+def test_cache_stats_popular_routes(db_copy):
+    import sqlite3
+    from Main.enhanced_flight_search import EnhancedFlightSearchClient  # type: ignore
+    with sqlite3.connect(db_copy) as conn:
+        conn.execute("PRAGMA foreign_keys=OFF")
+        conn.executemany(
+            "INSERT INTO flight_searches(search_id, search_timestamp, departure_airport_code, arrival_airport_code) VALUES (?,datetime('now'),?,?)",
+            [('PR1', 'LAX', 'JFK'), ('PR2', 'LAX', 'JFK'), ('PR3', 'SFO', 'SEA')],
+        )
+    client = EnhancedFlightSearchClient(api_key='DUMMY', db_path=str(db_copy))
+    stats = client.get_cache_stats()
+    assert stats['popular_routes'][0] == {'route': 'LAX-JFK', 'search_count': 2}
+    # Second call reports the raw delta
+    again = client.get_cache_stats()
+    assert again['raw_api_queries_delta'] == 0
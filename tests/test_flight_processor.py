@@ -0,0 +1,131 @@
+import sqlite3
+import warnings
+
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore', DeprecationWarning)
+    from Main import flight_processor as fp
+
+# Legacy schema subset with the columns FlightDataProcessor writes
+SCHEMA = [
+"""CREATE TABLE flight_searches( search_id TEXT PRIMARY KEY, search_timestamp TEXT, departure_id TEXT, arrival_id TEXT, outbound_date TEXT, return_date TEXT, flight_type INTEGER, adults INTEGER, children INTEGER, infants_in_seat INTEGER, infants_on_lap INTEGER, travel_class INTEGER, currency TEXT, country_code TEXT, language_code TEXT, max_price INTEGER, stops INTEGER, deep_search INTEGER, show_hidden INTEGER, raw_parameters TEXT, response_status TEXT, total_results INTEGER, api_query_id INTEGER);""",
+"""CREATE TABLE flight_results( id INTEGER PRIMARY KEY AUTOINCREMENT, search_id TEXT, result_type TEXT, result_rank INTEGER, total_duration INTEGER, total_price INTEGER, price_currency TEXT, flight_type TEXT, layover_count INTEGER, carbon_emissions_flight INTEGER, carbon_emissions_typical INTEGER, carbon_emissions_difference_percent INTEGER, departure_token TEXT, booking_token TEXT, airline_logo_url TEXT);""",
+"""CREATE TABLE flight_segments( id INTEGER PRIMARY KEY AUTOINCREMENT, flight_result_id INTEGER, segment_order INTEGER, departure_airport_id TEXT, departure_airport_name TEXT, departure_time TEXT, arrival_airport_id TEXT, arrival_airport_name TEXT, arrival_time TEXT, duration_minutes INTEGER, airplane_model TEXT, airline_code TEXT, airline_name TEXT, airline_logo_url TEXT, flight_number TEXT, travel_class TEXT, legroom TEXT, is_overnight INTEGER, often_delayed INTEGER, ticket_also_sold_by TEXT, extensions TEXT, plane_and_crew_by TEXT);""",
+"""CREATE TABLE layovers( id INTEGER PRIMARY KEY AUTOINCREMENT, flight_result_id INTEGER, layover_order INTEGER, airport_id TEXT, airport_name TEXT, duration_minutes INTEGER, is_overnight INTEGER);""",
+"""CREATE TABLE airlines( airline_code TEXT PRIMARY KEY, airline_name TEXT, logo_url TEXT, last_seen TEXT);""",
+"""CREATE TABLE price_insights( id INTEGER PRIMARY KEY AUTOINCREMENT, search_id TEXT, lowest_price INTEGER, price_level TEXT, typical_price_low INTEGER, typical_price_high INTEGER, price_history TEXT);""",
+"""CREATE TABLE route_analytics( route_key TEXT PRIMARY KEY, departure_airport TEXT, arrival_airport TEXT, total_searches INTEGER, avg_price REAL, min_price INTEGER, max_price INTEGER, last_search_date TEXT, updated_at TEXT);""",
+]
+
+class DummyRawDB:
+    """Stand-in for SerpAPIDatabase (raw api_queries storage)."""
+    def __init__(self, db_path):
+        self.calls = []
+    def insert_api_response(self, **kwargs):
+        self.calls.append(kwargs)
+        return len(self.calls)
+
+def build_db(tmp_path):
+    path = str(tmp_path / 'legacy.db')
+    conn = sqlite3.connect(path)
+    for s in SCHEMA:
+        conn.execute(s)
+    conn.commit()
+    return path, conn
+
+def make_processor(path):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning)
+        return fp.FlightDataProcessor(path, db_helper_cls=DummyRawDB)
+
+def _seg(dep, arr, airline):
+    return {'departure_airport': {'id': dep}, 'arrival_airport': {'id': arr}, 'airline_code': airline, 'airline': airline + ' Air'}
+
+def make_result(search_id):
+    return {
+        'search_id': search_id,
+        'status': 'success',
+        'search_parameters': {'departure_id': 'LAX', 'arrival_id': 'JFK', 'outbound_date': '2025-12-01'},
+        'raw_response': {
+            'search_metadata': {'status': 'Success'},
+            'best_flights': [{'price': 500, 'flights': [_seg('LAX', 'ORD', 'AA'), _seg('ORD', 'JFK', 'UA')], 'layovers': [{'id': 'ORD', 'duration': 60}]}],
+            'other_flights': [{'price': 300, 'flights': [_seg('LAX', 'JFK', 'AA')]}, {'price': 400, 'flights': [_seg('LAX', 'DEN', 'DL'), _seg('DEN', 'JFK', 'DL')], 'layovers': [{'id': 'DEN', 'duration': 90}]}],
+            'price_insights': {'lowest_price': 300, 'typical_price_range': [250, 450], 'price_history': [[1, 300]]},
+        },
+    }
+
+def children_by_result(conn, search_id):
+    """(result_type, rank) -> (segment route, layover airports) via flight_result_id."""
+    out = {}
+    for fid, rtype, rank in conn.execute('SELECT id, result_type, result_rank FROM flight_results WHERE search_id = ?', (search_id,)):
+        segs = [r[0] + '-' + r[1] for r in conn.execute('SELECT departure_airport_id, arrival_airport_id FROM flight_segments WHERE flight_result_id = ? ORDER BY segment_order', (fid,))]
+        lays = [r[0] for r in conn.execute('SELECT airport_id FROM layovers WHERE flight_result_id = ? ORDER BY layover_order', (fid,))]
+        out[(rtype, rank)] = (segs, lays)
+    return out
+
+EXPECTED_CHILDREN = {
+    ('best_flight', 1): (['LAX-ORD', 'ORD-JFK'], ['ORD']),
+    ('other_flight', 1): (['LAX-JFK'], []),
+    ('other_flight', 2): (['LAX-DEN', 'DEN-JFK'], ['DEN']),
+}
+
+def test_flight_processor_maps_children_to_returned_ids(tmp_path):
+    path, conn = build_db(tmp_path)
+    with make_processor(path) as proc:
+        stats = proc.process_search_response(make_result('S1'))
+        stats2 = proc.process_search_response(make_result('S2'))
+    assert stats['errors'] == [] and stats['flights_processed'] == 3 and stats['airlines_extracted'] == 3
+    assert stats['api_record_id'] == 1 and stats2['api_record_id'] == 2
+    # Second response gets its own ids; segments/layovers follow their own flight
+    assert children_by_result(conn, 'S1') == EXPECTED_CHILDREN
+    assert children_by_result(conn, 'S2') == EXPECTED_CHILDREN
+    assert conn.execute('SELECT COUNT(*) FROM flight_segments').fetchone()[0] == 10
+    assert conn.execute('SELECT COUNT(*) FROM layovers').fetchone()[0] == 4
+    assert conn.execute('SELECT api_query_id, total_results FROM flight_searches WHERE search_id = ?', ('S2',)).fetchone() == (2, 3)
+    assert conn.execute('SELECT total_searches, min_price, max_price FROM route_analytics WHERE route_key = ?', ('LAX-JFK',)).fetchone() == (2, 300, 500)
+
+def test_flight_processor_maps_ids_without_returning(tmp_path, monkeypatch):
+    monkeypatch.setattr(fp, '_HAS_RETURNING', False)  # SQLite < 3.35 path
+    path, conn = build_db(tmp_path)
+    with make_processor(path) as proc:
+        stats = proc.process_search_response(make_result('S1'))
+    assert stats['errors'] == [] and stats['flights_processed'] == 3
+    assert children_by_result(conn, 'S1') == EXPECTED_CHILDREN
+
+def test_flight_processor_rolls_back_whole_response(tmp_path, monkeypatch):
+    path, conn = build_db(tmp_path)
+    with make_processor(path) as proc:
+        def _fail(*_args):
+            raise sqlite3.OperationalError('forced failure')
+        monkeypatch.setattr(proc, '_store_price_insights', _fail)
+        stats = proc.process_search_response(make_result('S1'))
+        assert stats['errors'] == ['forced failure']
+        assert proc._airlines_seen == {}
+        for table in ('flight_searches', 'flight_results', 'flight_segments', 'layovers', 'airlines', 'route_analytics'):
+            assert conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] == 0, table
+        # Cleared memo: the next successful response writes the airlines again
+        monkeypatch.undo()
+        assert proc.process_search_response(make_result('S2'))['errors'] == []
+    assert conn.execute('SELECT airline_code FROM airlines ORDER BY 1').fetchall() == [('AA',), ('DL',), ('UA',)]
+
+def test_flight_processor_refreshes_last_seen_for_unchanged_airlines(tmp_path):
+    path, conn = build_db(tmp_path)
+    with make_processor(path) as proc:
+        proc.process_search_response(make_result('S1'))
+        conn.execute("UPDATE airlines SET last_seen = '2000-01-01'")
+        conn.commit()
+        proc.process_search_response(make_result('S2'))
+    assert conn.execute("SELECT COUNT(*) FROM airlines WHERE last_seen > '2000-01-01'").fetchone()[0] == 3
+
+def test_flight_processor_stores_raw_body_verbatim(tmp_path):
+    path, conn = build_db(tmp_path)
+    result = make_result('S1')
+    body = b'{"search_metadata": {"status": "Success"},  "best_flights": []}'
+    result['raw_response_bytes'] = body
+    with make_processor(path) as proc:
+        proc.process_search_response(result)
+        # Without the body the parsed dict is serialized
+        proc.process_search_response(make_result('S2'))
+        raw_calls = proc.serpapi_db.calls
+    assert raw_calls[0]['raw_response'] == body.decode('utf-8')
+    assert fp.FlightDataProcessor.parse_raw(raw_calls[1]['raw_response']) == make_result('S2')['raw_response']
+    assert raw_calls[0]['search_term'] == 'LAX-JFK'
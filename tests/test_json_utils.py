@@ -0,0 +1,30 @@
+import json
+
+from Main.core.json_utils import dumps, loads  # type: ignore
+
+
+def test_dumps_round_trips_api_payload():
+    payload = {'best_flights': [{'price': 123, 'flights': [{'airline': 'Zürich Air', 'duration': 95.5}]}], 'other_flights': [], 'search_metadata': {'id': 'x'}}
+    out = dumps(payload)
+    assert isinstance(out, str)
+    assert json.loads(out) == payload
+
+
+def test_dumps_non_str_keys_match_stdlib():
+    assert json.loads(dumps({1: 'a'})) == json.loads(json.dumps({1: 'a'}))
+
+
+def test_loads_accepts_text_and_bytes():
+    text = json.dumps({'best_flights': [{'price': 123, 'airline': 'Zürich Air'}], 'x': None})
+    assert loads(text) == json.loads(text)
+    assert loads(text.encode('utf-8')) == json.loads(text)
+
+
+def test_dumps_indent_and_compact_forms():
+    payload = {'api_calls': 3, 'nested': {'a': [1, 2]}}
+    pretty = dumps(payload, indent=True)
+    assert '\n  "api_calls": 3' in pretty
+    assert json.loads(pretty) == payload
+    compact = dumps(payload, compact=True)
+    assert ' ' not in compact
+    assert json.loads(compact) == payload
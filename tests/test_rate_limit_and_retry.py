@@ -41,3 +41,11 @@ def test_retry_metrics_increment(monkeypatch, attempts):
     assert snap.get('api_failures',0) == 1
     expected_retries = max(0, attempts-1)
     assert snap.get('retry_attempts',0) == expected_retries
+
+
+def test_client_reuses_shared_session():
+    from Main.serpapi_client import build_session  # type: ignore
+    shared = build_session()
+    client = SerpAPIFlightClient(api_key="DUMMY", session=shared)
+    assert client.session is shared
+    assert shared.get_adapter('https://serpapi.com/search')._pool_maxsize == 32
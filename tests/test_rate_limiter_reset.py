@@ -15,3 +15,12 @@ def test_rate_limiter_reset():
     assert len(rl._minute) == 5
     rl.reset()
     assert len(rl._minute) == 0 and len(rl._hour) == 0
+
+
+def test_token_bucket_single_cleanup_token():
+    from core.common_validation import TokenBucket  # type: ignore
+    bucket = TokenBucket(capacity=1, refill_rate=1 / 900)
+    assert bucket.try_consume(1) is True
+    assert bucket.try_consume(1) is False  # no refill within the window
+    bucket.last_refill -= 900
+    assert bucket.try_consume(1) is True
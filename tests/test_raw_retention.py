@@ -81,6 +81,20 @@ class TestRawRetentionPolicy(unittest.TestCase):
         # prune with raw
         self.cache.cleanup_old_data(max_age_hours=1, prune_raw=True)
         self.assertEqual(self._count('api_queries'), 0, 'Raw api_queries should be pruned when prune_raw=True')
+    def test_cleanup_removes_only_expired_search_trees(self):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("INSERT INTO flight_searches (search_id, created_at) VALUES (?, ?)", ("search_new", datetime.now().isoformat()))
+            for sid in ("search_old", "search_new"):
+                fid = conn.execute("INSERT INTO flight_results (search_id) VALUES (?)", (sid,)).lastrowid
+                conn.execute("INSERT INTO flight_segments (flight_result_id) VALUES (?)", (fid,))
+                conn.execute("INSERT INTO layovers (flight_result_id) VALUES (?)", (fid,))
+                conn.execute("INSERT INTO price_insights (search_id) VALUES (?)", (sid,))
+            conn.commit()
+        self.cache.cleanup_old_data(max_age_hours=1)
+        for table in ('flight_searches', 'flight_results', 'flight_segments', 'layovers', 'price_insights'):
+            self.assertEqual(self._count(table), 1, table)
+        with sqlite3.connect(self.db_path) as conn:
+            self.assertEqual(conn.execute("SELECT search_id FROM flight_searches").fetchone()[0], "search_new")
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
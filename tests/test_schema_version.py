@@ -21,3 +21,55 @@ def test_schema_version_exists():
     finally:
         cur.close()
         conn.close()
+
+
+
+def test_bootstrap_runs_once_per_database_file(tmp_path, monkeypatch):
+    db = database_helper.SerpAPIDatabase(str(tmp_path / 'boot.db'))
+    calls = []
+    original = database_helper.SerpAPIDatabase._ensure_schema_version
+    monkeypatch.setattr(database_helper.SerpAPIDatabase, '_ensure_schema_version',
+                        lambda self, conn: (calls.append(1), original(self, conn)))
+    for _ in range(3):
+        conn = db.get_connection()
+        try:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+            assert conn.execute("SELECT version FROM schema_version WHERE id=1").fetchone() is not None
+        finally:
+            conn.close()
+    assert len(calls) == 1
+    # A new file at the same path is bootstrapped again
+    for suffix in ('', '-wal', '-shm'):
+        pathlib.Path(str(tmp_path / 'boot.db') + suffix).unlink(missing_ok=True)
+    conn = db.get_connection()
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        assert conn.execute("SELECT version FROM schema_version WHERE id=1").fetchone() is not None
+    finally:
+        conn.close()
+    assert len(calls) == 2
+
+
+def test_database_stats_total_matches_per_type_counts(tmp_path):
+    db = database_helper.SerpAPIDatabase(str(tmp_path / 'stats.db'))
+    conn = db.get_connection()
+    conn.execute("CREATE TABLE api_queries (id INTEGER PRIMARY KEY, query_type TEXT, created_at TEXT)")
+    conn.executemany("INSERT INTO api_queries (query_type, created_at) VALUES (?, ?)",
+                     [('google_flights', '2025-01-01'), ('google_flights', '2025-01-03'), ('search', '2025-01-02')])
+    conn.commit()
+    conn.close()
+    stats = db.get_database_stats()
+    assert stats['total_records'] == 3
+    assert stats['records_by_type'] == {'google_flights': 2, 'search': 1}
+    assert stats['date_range'] == {'earliest': '2025-01-01', 'latest': '2025-01-03'}
+
+
+def test_database_stats_empty_table_skips_date_range_query(tmp_path):
+    db = database_helper.SerpAPIDatabase(str(tmp_path / 'empty.db'))
+    conn = db.get_connection()
+    conn.execute("CREATE TABLE api_queries (id INTEGER PRIMARY KEY, query_type TEXT, created_at TEXT)")
+    conn.commit()
+    conn.close()
+    stats = db.get_database_stats()
+    assert stats['total_records'] == 0
+    assert stats['date_range'] == {'earliest': None, 'latest': None}
@@ -48,3 +48,51 @@ def test_structured_storage_failure_increments_metric(monkeypatch):
     assert result['success'] is True
     snap = METRICS.snapshot()
     assert snap.get('structured_storage_failures', 0) == 1
+
+
+def test_async_persistence_runs_storage_off_request_path(monkeypatch):
+    client = EnhancedFlightSearchClient(api_key='DUMMY')
+    client._persist_async = True
+    METRICS.reset()
+    stored = []
+    monkeypatch.setattr(client, '_store_raw', lambda sid, params, data: 7)
+    monkeypatch.setattr(client, '_store_structured_data', lambda sid, params, data, qid: stored.append((sid, qid)))
+
+    class DummyAPI:
+        def search_round_trip(self, **kw):
+            return {'success': True, 'search_id': 'ASYNC1', 'data': {'best_flights': [], 'other_flights': []}}
+        search_one_way = search_round_trip
+    client.api_client = DummyAPI()
+
+    from datetime import datetime, timedelta
+    future_date = (datetime.now() + timedelta(days=10)).strftime('%Y-%m-%d')
+    result = client.search_flights('AAA', 'BBB', future_date, max_cache_age_hours=0)
+    assert result['success'] is True and result['search_id'] == 'ASYNC1'
+    client.flush_persistence()
+    assert stored == [('ASYNC1', 7)]
+
+
+def test_async_persistence_queue_is_bounded(monkeypatch):
+    import threading
+    client = EnhancedFlightSearchClient(api_key='DUMMY')
+    client._store_slots = threading.BoundedSemaphore(1)
+    gate = threading.Event()
+    monkeypatch.setattr(client, '_persist', lambda *a: gate.wait(5))
+    client._submit_persist('Q1', {}, {}, {})
+    assert client._store_slots.acquire(blocking=False) is False  # slot held while Q1 is pending
+    gate.set()
+    client.flush_persistence()
+    assert client._store_slots.acquire(blocking=False) is True  # released once written
+
+
+def test_exit_hook_drains_pool_recreated_after_flush(monkeypatch):
+    from Main import enhanced_flight_search as efs
+    client = EnhancedFlightSearchClient(api_key='DUMMY')
+    written = []
+    monkeypatch.setattr(client, '_persist', lambda sid, *a: written.append(sid))
+    client._submit_persist('X1', {}, {}, {})
+    client.flush_persistence()
+    client._submit_persist('X2', {}, {}, {})  # new pool; no extra exit hook registered
+    assert client in efs._PERSIST_CLIENTS
+    efs._flush_persistence_at_exit()
+    assert written == ['X1', 'X2'] and client._store_pool is None
@@ -22,7 +22,7 @@ def build_conn():
 
 class DummyCacheKeyGen:
     def generate_cache_key(self, params):
-        return 'cache:'+params.get('departure_id','')+params.get('arrival_id','')
+        return 'cache:'+params.get('departure_id','')+params.get('arrival_id','')+params.get('outbound_date','')
 
 def test_structured_writer_basic(monkeypatch):
     # Patch FlightSearchCache inside writer to avoid hitting real DB
@@ -43,3 +43,119 @@ def test_structured_writer_basic(monkeypatch):
     # Idempotency (second call should not duplicate)
     writer.store('S1', params, api, api_query_id=1)
     cur.execute('SELECT COUNT(*) FROM flight_results'); assert cur.fetchone()[0] == 1
+
+def _seg(dep, arr):
+    return {'departure_airport': {'id': dep}, 'arrival_airport': {'id': arr}, 'airline': 'AB', 'flight_number': 'AB 1'}
+
+def test_structured_writer_bulk_reference_lookups(monkeypatch):
+    from Main import cache as cache_mod
+    monkeypatch.setattr(cache_mod, 'FlightSearchCache', lambda db_path: DummyCacheKeyGen())
+    conn = build_conn()
+    conn.executemany('INSERT INTO airports VALUES (?, ?)', [('AAA', 'A'), ('BBB', 'B'), ('CCC', 'C')])
+    monkeypatch.setattr('Main.persistence.structured_writer.open_connection', lambda _path: conn)
+    statements = []
+    conn.set_trace_callback(statements.append)
+    api = {'best_flights': [{'price': 10, 'flights': [_seg('AAA', 'CCC'), _seg('CCC', 'BBB')], 'layovers': [{'id': 'CCC', 'duration': 60}]}], 'other_flights': []}
+    StructuredFlightWriter('ignored.db').store('S2', {'departure_id': 'AAA', 'arrival_id': 'BBB', 'outbound_date': '2025-12-01'}, api, api_query_id=None)
+    airport_selects = [s for s in statements if s.startswith('SELECT airport_code FROM airports')]
+    airline_inserts = [s for s in statements if 'INTO airlines' in s]
+    assert len(airport_selects) == 1  # one IN lookup for all endpoints + layovers
+    assert len(airline_inserts) == 1  # AB inserted once, not per segment
+    assert not [s for s in statements if 'COUNT(*)' in s]  # logged counts come from the build phase
+    assert not [s for s in statements if s.startswith('DELETE FROM flight_results')]  # fresh search_id: nothing to replace
+    assert conn.execute('SELECT COUNT(*) FROM flight_segments').fetchone()[0] == 2
+    # Re-store: dependents of the replaced flight_results rows are cascaded away
+    StructuredFlightWriter('ignored.db').store('S2', {'departure_id': 'AAA', 'arrival_id': 'BBB', 'outbound_date': '2025-12-01'}, api, api_query_id=None)
+    assert conn.execute('SELECT COUNT(*) FROM flight_segments').fetchone()[0] == 2
+    assert conn.execute('SELECT COUNT(*) FROM layovers').fetchone()[0] == 1
+
+def test_structured_writer_reuses_confirmed_airports(monkeypatch):
+    from Main import cache as cache_mod
+    monkeypatch.setattr(cache_mod, 'FlightSearchCache', lambda db_path: DummyCacheKeyGen())
+    conn = build_conn()
+    conn.executemany('INSERT INTO airports VALUES (?, ?)', [('AAA', 'A'), ('BBB', 'B')])
+    monkeypatch.setattr('Main.persistence.structured_writer.open_connection', lambda _path: conn)
+    writer = StructuredFlightWriter('ignored.db')
+    params = {'departure_id': 'AAA', 'arrival_id': 'BBB', 'outbound_date': '2025-12-01'}
+    writer.store('S3', params, {'best_flights': [], 'other_flights': []}, api_query_id=None)
+    statements = []
+    conn.set_trace_callback(statements.append)
+    writer.store('S4', {**params, 'outbound_date': '2025-12-02'}, {'best_flights': [], 'other_flights': []}, api_query_id=None)
+    assert not [s for s in statements if s.startswith('SELECT airport_code FROM airports')]
+    assert conn.execute('SELECT COUNT(*) FROM flight_searches').fetchone()[0] == 2
+
+def test_structured_writer_skips_unchanged_payload(monkeypatch):
+    from Main import cache as cache_mod
+    monkeypatch.setattr(cache_mod, 'FlightSearchCache', lambda db_path: DummyCacheKeyGen())
+    conn = build_conn()
+    conn.executemany('INSERT INTO airports VALUES (?, ?)', [('AAA', 'A'), ('BBB', 'B')])
+    monkeypatch.setattr('Main.persistence.structured_writer.open_connection', lambda _path: conn)
+    writer = StructuredFlightWriter('ignored.db')
+    params = {'departure_id': 'AAA', 'arrival_id': 'BBB', 'outbound_date': '2025-12-01'}
+    api = {'best_flights': [{'price': 10, 'flights': [{'departure_airport': {'id': 'AAA'}, 'arrival_airport': {'id': 'BBB'}, 'airline': 'AB', 'flight_number': 'AB 1'}]}], 'other_flights': []}
+    writer.store('S5', params, api, api_query_id=None)
+    statements = []
+    conn.set_trace_callback(statements.append)
+    writer.store('S5', params, api, api_query_id=None)
+    assert not [s for s in statements if 'DELETE' in s or 'INSERT' in s]
+    # Changed payload is written again
+    api['best_flights'][0]['price'] = 12
+    writer.store('S5', params, api, api_query_id=None)
+    assert conn.execute('SELECT total_price FROM flight_results').fetchone()[0] in (12, '12')
+    # Rows removed behind the writer's back (cache cleanup) are restored
+    conn.execute("DELETE FROM flight_results")
+    conn.execute("DELETE FROM flight_searches")
+    writer.store('S5', params, api, api_query_id=None)
+    assert conn.execute('SELECT COUNT(*) FROM flight_results').fetchone()[0] == 1
+
+def test_structured_writer_empty_response_skips_orphan_sweep(monkeypatch):
+    from Main import cache as cache_mod
+    monkeypatch.setattr(cache_mod, 'FlightSearchCache', lambda db_path: DummyCacheKeyGen())
+    conn = build_conn()
+    conn.executemany('INSERT INTO airports VALUES (?, ?)', [('AAA', 'A'), ('BBB', 'B')])
+    monkeypatch.setattr('Main.persistence.structured_writer.open_connection', lambda _path: conn)
+    statements = []
+    conn.set_trace_callback(statements.append)
+    StructuredFlightWriter('ignored.db').store('S6', {'departure_id': 'AAA', 'arrival_id': 'BBB', 'outbound_date': '2025-12-01'}, {'best_flights': [], 'other_flights': []}, api_query_id=None)
+    assert not [s for s in statements if 'NOT IN' in s]
+    # The search row is still recorded so the empty result is served from cache
+    assert conn.execute("SELECT total_results FROM flight_searches WHERE search_id='S6'").fetchone()[0] == 0
+
+def test_structured_writer_skips_rows_at_unknown_airports(monkeypatch):
+    from Main import cache as cache_mod
+    from Main.config import PROCESSING_CONFIG
+    monkeypatch.setattr(cache_mod, 'FlightSearchCache', lambda db_path: DummyCacheKeyGen())
+    monkeypatch.setitem(PROCESSING_CONFIG, 'auto_extract_airports', False)
+    conn = build_conn()
+    conn.executemany('INSERT INTO airports VALUES (?, ?)', [('AAA', 'A'), ('BBB', 'B')])
+    monkeypatch.setattr('Main.persistence.structured_writer.open_connection', lambda _path: conn)
+    api = {'best_flights': [{'price': 10, 'flights': [_seg('AAA', 'XXX'), _seg('XXX', 'BBB'), _seg('AAA', 'BBB')], 'layovers': [{'id': 'XXX', 'duration': 60}]}], 'other_flights': []}
+    StructuredFlightWriter('ignored.db').store('S7', {'departure_id': 'AAA', 'arrival_id': 'BBB', 'outbound_date': '2025-12-01'}, api, api_query_id=None)
+    assert conn.execute('SELECT segment_order FROM flight_segments').fetchall() == [(3,)]
+    assert conn.execute('SELECT COUNT(*) FROM layovers').fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM airports WHERE airport_code='XXX'").fetchone()[0] == 0
+
+
+def test_structured_writer_same_payload_new_search_id_written_once(monkeypatch):
+    from Main import cache as cache_mod
+    monkeypatch.setattr(cache_mod, 'FlightSearchCache', lambda db_path: DummyCacheKeyGen())
+    conn = build_conn()
+    conn.executemany('INSERT INTO airports VALUES (?, ?)', [('AAA', 'A'), ('BBB', 'B')])
+    monkeypatch.setattr('Main.persistence.structured_writer.open_connection', lambda _path: conn)
+    writer = StructuredFlightWriter('ignored.db')
+    params = {'departure_id': 'AAA', 'arrival_id': 'BBB', 'outbound_date': '2025-12-01'}
+    api = {'best_flights': [{'price': 10, 'flights': [_seg('AAA', 'BBB')]}], 'other_flights': []}
+    writer.store('S8', params, api, api_query_id=1)
+    conn.execute("UPDATE flight_searches SET created_at = '2000-01-01'")
+    statements = []
+    conn.set_trace_callback(statements.append)
+    writer.store('S9', params, api, api_query_id=2)  # retry: new id, same payload
+    assert not [s for s in statements if 'DELETE' in s or 'INSERT' in s]
+    assert conn.execute('SELECT search_id, api_query_id FROM flight_searches').fetchall() == [('S8', 2)]
+    assert conn.execute('SELECT created_at FROM flight_searches').fetchone()[0] > '2000-01-01'
+    assert conn.execute('SELECT COUNT(*) FROM flight_results').fetchone()[0] == 1
+    # S8 rewritten with new data: the old payload no longer maps to it
+    api2 = {'best_flights': [{'price': 12, 'flights': [_seg('AAA', 'BBB')]}], 'other_flights': []}
+    writer.store('S8', params, api2, api_query_id=3)
+    writer.store('S10', params, api, api_query_id=4)
+    assert {r[0] for r in conn.execute('SELECT search_id FROM flight_searches')} == {'S8', 'S10'}
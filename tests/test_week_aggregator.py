@@ -18,3 +18,45 @@ def test_week_aggregator_basic():
     assert res['summary']['successful_searches'] == 2
     assert 'price_trend' in res
     assert 'daily_results' in res and len(res['daily_results']) == 7
+
+
+class PrefetchClient(DummyClient):
+    def __init__(self, cached_dates, success_dates):
+        super().__init__(success_dates)
+        self.cached_dates = set(cached_dates)
+        self.forced = []
+    def search_cache_many(self, dep, arr, dates, **kwargs):
+        return {d: {'success': True, 'source': 'cache', 'data': {'best_flights': [{'price': 90, 'flights': []}], 'other_flights': []}}
+                for d in dates if d in self.cached_dates}
+    def search_flights(self, dep, arr, date, **kwargs):
+        self.forced.append(kwargs.get('force_api'))
+        return super().search_flights(dep, arr, date, **kwargs)
+
+def test_week_aggregator_prefetch_only_fetches_misses():
+    agg = WeekRangeAggregator(max_workers=3)
+    client = PrefetchClient(cached_dates=['2025-12-01', '2025-12-02'], success_dates=['2025-12-05'])
+    res = agg.run_week(client, 'AAA', 'BBB', '2025-12-01')
+    assert sorted(client.calls) == ['2025-12-03', '2025-12-04', '2025-12-05', '2025-12-06', '2025-12-07']
+    assert all(client.forced)  # misses skip the redundant per-day cache probe
+    assert res['summary']['successful_searches'] == 3
+    assert list(res['daily_results']) == [f'2025-12-0{i}' for i in range(1, 8)]
+
+def test_week_aggregator_parses_int_and_string_prices():
+    class MixedClient(DummyClient):
+        def search_flights(self, dep, arr, date, **kwargs):
+            return {'success': True, 'data': {'best_flights': [{'price': 250, 'flights': []}],
+                                              'other_flights': [{'price': '1,120 USD', 'flights': []}, {'flights': []}]}}
+    res = WeekRangeAggregator().run_week(MixedClient([]), 'AAA', 'BBB', '2025-12-01')
+    assert res['price_trend']['daily_min_prices']['2025-12-01'] == 250.0
+    assert res['price_trend']['daily_avg_prices']['2025-12-01'] == 685.0
+    assert ['price' in f for f in res['all_week_flights'][-7:]] == [False] * 7  # unpriced sort last
+    assert not any('_price_f' in f for f in res['all_week_flights'])
+
+def test_week_aggregator_shared_flight_object_not_clobbered():
+    shared = {'price': 100, 'flights': []}
+    class SharedClient(DummyClient):
+        def search_flights(self, dep, arr, date, **kwargs):
+            return {'success': True, 'data': {'best_flights': [shared], 'other_flights': []}}
+    res = WeekRangeAggregator().run_week(SharedClient([]), 'AAA', 'BBB', '2025-12-01')
+    assert sorted(f['search_date'] for f in res['all_week_flights']) == [f'2025-12-0{i}' for i in range(1, 8)]
+    assert shared == {'price': 100, 'flights': []}  # client's dict left untouched (may be queued for persistence)
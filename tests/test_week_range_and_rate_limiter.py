@@ -184,3 +184,15 @@ def test_rate_limiter_boundary():
     past = datetime.now() - timedelta(seconds=61)
     rl._minute = [past for _ in rl._minute]
     assert rl.can_make_request(), 'Rate limiter should allow after window expiration'
+
+
+def test_rate_limiter_try_acquire_is_atomic_across_threads():
+    from concurrent.futures import ThreadPoolExecutor
+    from Main.config import RATE_LIMIT_CONFIG  # type: ignore
+    rl = RateLimiter()
+    limit = RATE_LIMIT_CONFIG['requests_per_minute']
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        granted = list(pool.map(lambda _: rl.try_acquire(), range(limit + 10)))
+    assert sum(granted) == limit
+    assert len(rl._minute) == limit
+    assert not rl.try_acquire()